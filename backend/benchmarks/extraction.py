@@ -0,0 +1,86 @@
+"""Receipt extraction throughput.
+
+Usage (from backend/):
+    python -m benchmarks.extraction [--seconds 2]
+
+The corpus is the boleta/factura fixtures from tests/test_scan.py, plus
+multi-page and noise-padded variants of them, so the numbers track what the
+parser actually sees. The previous extractor from routes/scan.py (one
+full-text scan per pattern, pages split and lowercased per amount
+pattern, the first RUT taken without checking it) is kept here as the
+baseline.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ocr import PAGE_BREAK
+from receipt_parser import extract_fields
+from tests.test_scan import BOLETA_TEXT, FACTURA_TEXT, NO_DATA_TEXT
+
+NOISE = "\n".join(f"Item {i:03d}   Cantidad 1   $1.{i:03d}" for i in range(60))
+
+CORPUS = {
+    "boleta": BOLETA_TEXT,
+    "factura": FACTURA_TEXT,
+    "no_data": NO_DATA_TEXT,
+    "boleta_long": NOISE + BOLETA_TEXT + NOISE,
+    "factura_3_pages": PAGE_BREAK.join([FACTURA_TEXT, NOISE, "Total: 45.990"]),
+}
+
+
+def _legacy_page_amount(text: str) -> float | None:
+    for p in (
+        r'(?<!\w)(?:total|monto total|a pagar|importe neto|importe)[\s:$]*([0-9]{1,3}(?:\.[0-9]{3})+)',
+        r'(?<!\w)(?:total|monto total|a pagar|importe neto|importe)[\s:$]*([0-9]{2,})',
+    ):
+        m = re.search(p, text.lower())
+        if m:
+            return float(m.group(1).replace('.', ''))
+    return None
+
+
+def legacy_extract(text: str) -> dict:
+    rut = re.findall(r'\b\d{1,2}\.?\d{3}\.?\d{3}-[\dkK]\b', text)
+    amount = None
+    for page in reversed(text.split(PAGE_BREAK)):
+        amount = _legacy_page_amount(page)
+        if amount is not None:
+            break
+    m = (
+        re.search(r'(?:raz[oó]n social|nombre|emisor)[:\s]+([A-ZÁÉÍÓÚÑ][^\n]{3,60})', text, re.IGNORECASE)
+        or re.search(r'([A-ZÁÉÍÓÚÑ]{2,}[^\n]{0,55}(?:LTDA|S\.A\.|S\.P\.A\.|EIRL|SpA))', text)
+    )
+    return {"amount": amount, "rut": rut[0] if rut else None, "provider_name": m.group(1).strip() if m else None}
+
+
+def measure(fn, text: str, seconds: float) -> float:
+    """Extractions per second over roughly ``seconds`` of wall time."""
+    count = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            fn(text)
+        count += 100
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1.0, help="time budget per case")
+    args = parser.parse_args()
+
+    print(f"{'case':<18}{'legacy/s':>12}{'engine/s':>12}{'speedup':>9}")
+    for name, text in CORPUS.items():
+        legacy = measure(legacy_extract, text, args.seconds)
+        engine = measure(extract_fields, text, args.seconds)
+        print(f"{name:<18}{legacy:>12,.0f}{engine:>12,.0f}{engine / legacy:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
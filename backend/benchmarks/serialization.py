@@ -0,0 +1,88 @@
+"""List response serialization: FastAPI's response_model path vs FAST_JSON.
+
+Usage (from backend/):
+    python -m benchmarks.serialization [--rows 1000,10000,100000] [--repeat 3]
+
+Both endpoints return the same in-memory Expense rows (with provider and
+recipient attached, as GET /expenses loads them), so only serialization and
+the HTTP round trip through the ASGI test client are measured. Timings are
+the best of --repeat runs. The bodies are compared once per size.
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+import fast_json
+from models import Expense, Person
+from schemas import ExpenseOut
+
+
+def make_rows(n: int) -> list:
+    provider = Person(id=1, name="Farmacia Central", type="Company", rut="76.123.456-0", user_id=1)
+    recipient = Person(id=2, name="Ana", type="Individual", rut="12.345.678-5", relation="Self", user_id=1)
+    start = datetime.date(2024, 1, 1)
+    return [
+        Expense(
+            id=i, user_id=1, title=f"Compra {i}", amount=1000.0 + i, category="Food",
+            date=start + datetime.timedelta(days=i % 365), note=None if i % 3 else "nota",
+            provider_id=1, recipient_id=2, provider=provider, recipient=recipient,
+            updated_at=datetime.datetime(2024, 6, 1, 12, 30), change_seq=i,
+        )
+        for i in range(n)
+    ]
+
+
+def build_app(rows: list) -> FastAPI:
+    app = FastAPI()
+    serializer = fast_json.ListSerializer(ExpenseOut)
+
+    @app.get("/current", response_model=List[ExpenseOut])
+    def current():
+        return rows
+
+    @app.get("/fast", response_model=List[ExpenseOut])
+    def fast(response: Response):
+        return serializer.response(rows, response)
+
+    return app
+
+
+def best_of(client: TestClient, path: str, repeat: int) -> tuple[float, bytes]:
+    best = float("inf")
+    body = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = client.get(path).content
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="1000,10000,100000", help="comma-separated row counts")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    encoder = "orjson" if fast_json.orjson is not None else "pydantic (orjson not installed)"
+    print(f"fast path encoder: {encoder}")
+    print(f"{'rows':>8}{'current ms':>13}{'fast ms':>10}{'speedup':>9}{'same body':>11}")
+    for n in (int(r) for r in args.rows.split(",")):
+        with TestClient(build_app(make_rows(n))) as client:
+            current, current_body = best_of(client, "/current", args.repeat)
+            fast, fast_body = best_of(client, "/fast", args.repeat)
+        print(
+            f"{n:>8}{current * 1000:>13,.1f}{fast * 1000:>10,.1f}"
+            f"{current / fast:>8.1f}x{str(current_body == fast_body):>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
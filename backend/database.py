@@ -1,12 +1,80 @@
 import os
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./xpends.db")
 
 connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+
+# ── Pool and SQLite tuning ────────────────────────────
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+POOL_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Applied on every new SQLite connection. WAL lets readers run alongside a
+# writer, and busy_timeout makes writers wait instead of failing with
+# "database is locked".
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # negative = KiB
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+}
+
+
+def pool_options(url: str) -> dict:
+    if make_url(url).database in (None, "", ":memory:"):
+        return {}  # in-memory SQLite uses a single shared connection
+    return {
+        "pool_size": POOL_SIZE,
+        "max_overflow": POOL_MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def build_engine(url: str) -> Engine:
+    new_engine = create_engine(url, connect_args=connect_args, **pool_options(url))
+    if new_engine.dialect.name == "sqlite":
+        event.listen(new_engine, "connect", _apply_sqlite_pragmas)
+    return new_engine
+
+
+def describe_engine(target: Engine) -> str:
+    """One-line summary of the effective pool (and SQLite pragma) settings."""
+    pool = target.pool
+    parts = [f"dialect={target.dialect.name}", f"pool={type(pool).__name__}"]
+    if hasattr(pool, "size"):
+        parts += [
+            f"size={pool.size()}",
+            f"max_overflow={pool._max_overflow}",
+            f"recycle={pool._recycle}",
+            f"pre_ping={pool._pre_ping}",
+        ]
+    if target.dialect.name == "sqlite":
+        with target.connect() as conn:
+            for name in SQLITE_PRAGMAS:
+                parts.append(f"{name}={conn.exec_driver_sql(f'PRAGMA {name}').scalar()}")
+    return " ".join(parts)
+
+
+engine = build_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -17,3 +85,64 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# insert() constructs that support ON CONFLICT ... DO UPDATE, by dialect name.
+# Counter tables (rollups.py, versions.py) fall back to UPDATE-then-INSERT
+# on anything else.
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+# ── Async mode (opt-in) ───────────────────────────────
+# With ASYNC_DB=true the CRUD routers run as coroutines on an AsyncEngine
+# (aiosqlite for SQLite, asyncpg for Postgres). The sync engine above stays
+# available for scripts, migrations and endpoints without an async variant.
+ASYNC_DB = os.getenv("ASYNC_DB", "false").lower() == "true"
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS[parsed.get_backend_name()]).render_as_string(hide_password=False)
+
+
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DB:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    _async_url = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+    async_engine = create_async_engine(_async_url, connect_args=connect_args, **pool_options(_async_url))
+    if async_engine.dialect.name == "sqlite":
+        event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    # expire_on_commit=False: attribute access after commit must not trigger IO
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# ── Query instrumentation ─────────────────────────────
+# Counts SQL statements issued while a counter is active in the current
+# context. Listening on the Engine class covers every engine (tests included).
+_query_counter: ContextVar[list | None] = ContextVar("query_counter", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+@contextmanager
+def count_queries():
+    """Yield a one-element list holding the number of statements executed so far."""
+    counter = [0]
+    token = _query_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _query_counter.reset(token)
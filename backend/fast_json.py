@@ -0,0 +1,82 @@
+"""Opt-in fast serialization for large list responses (FAST_JSON=true).
+
+The default path for ``response_model=List[ExpenseOut]`` validates every ORM
+row into a Pydantic model (two more for the nested persons), dumps those back
+to Python and then encodes with the stdlib json module. Here the row-to-dict
+conversion is compiled once per schema from its fields and reads the loaded
+column values straight off each instance; orjson then encodes the result.
+Without orjson installed it falls back to one precompiled TypeAdapter doing
+a single validate + Rust-side dump.
+
+Only plain column types (str, int, float, bool, date, datetime, None) and
+nested models are supported, which covers the list schemas in schemas.py.
+The output is byte-for-byte the same as the default path
+(benchmarks/serialization.py checks it).
+"""
+import os
+import typing
+from typing import List
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # optional: pydantic's encoder is used instead
+    orjson = None
+
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() == "true"
+
+
+def _nested_model(annotation):
+    # PersonOut or Optional[PersonOut] -> PersonOut
+    for candidate in (annotation, *typing.get_args(annotation)):
+        if isinstance(candidate, type) and issubclass(candidate, BaseModel):
+            return candidate
+    return None
+
+
+def _compile(model: type[BaseModel]):
+    # (name, extractor for a nested model or None), in schema order so the
+    # keys come out in the same order as the default path
+    fields = []
+    for name, field in model.model_fields.items():
+        sub_model = _nested_model(field.annotation)
+        fields.append((name, None if sub_model is None else _compile(sub_model)))
+
+    def extract(obj) -> dict:
+        # Loaded columns live in the instance dict; anything else (expired or
+        # not yet loaded) goes through the attribute so it still loads.
+        state = obj.__dict__
+        row = {}
+        for name, extract_nested in fields:
+            value = state[name] if name in state else getattr(obj, name)
+            if extract_nested is not None and value is not None:
+                value = extract_nested(value)
+            row[name] = value
+        return row
+
+    return extract
+
+
+class ListSerializer:
+    """JSON-encode lists of ORM rows as ``List[model]`` without per-row models."""
+
+    def __init__(self, model: type[BaseModel]):
+        self.adapter = TypeAdapter(List[model])
+        self._extract = _compile(model)
+
+    def dumps(self, rows) -> bytes:
+        if orjson is None:
+            return self.adapter.dump_json(self.adapter.validate_python(rows, from_attributes=True))
+        return orjson.dumps([self._extract(row) for row in rows])
+
+    def response(self, rows, response: Response) -> Response:
+        # Returning a Response bypasses FastAPI's merge of the injected
+        # ``response`` (X-Next-Cursor, ETag, ...), so carry its headers over.
+        return Response(self.dumps(rows), media_type="application/json", headers=dict(response.headers))
+
+    def render(self, rows, response: Response):
+        """What a list endpoint returns: the encoded response with FAST_JSON on, else the rows."""
+        # Looked up at call time so tests and benchmarks can flip it
+        return self.response(rows, response) if FAST_JSON else rows
@@ -1,11 +1,17 @@
+import time
+
+# Startup report: time spent importing the app, registering routes and
+# setting up the database, logged once the lifespan hook has run.
+_boot = time.perf_counter()
+
+import logging
 import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from sqlalchemy import text
-from database import Base, engine
+import migrations
+import spa
+from database import engine, count_queries, describe_engine, ASYNC_DB, async_engine
 from routes.expenses import router as expenses_router
 from routes.auth import router as auth_router
 from routes.users import router as users_router
@@ -13,21 +19,66 @@ from routes.categories import router as categories_router
 from routes.persons import router as persons_router
 from routes.scan import router as scan_router
 
+logger = logging.getLogger("uvicorn.error")
+
+startup_timings = {"imports_ms": (time.perf_counter() - _boot) * 1000}
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
-    with engine.connect() as _conn:
-        try:
-            _conn.execute(text("ALTER TABLE persons ADD COLUMN relation TEXT"))
-            _conn.commit()
-        except Exception:
-            pass  # column already exists
+    start = time.perf_counter()
+    logger.info("Database: %s", describe_engine(engine))
+    schema = migrations.upgrade(engine)
+    startup_timings["db_ms"] = (time.perf_counter() - start) * 1000
+    startup_timings["schema"] = schema
+    logger.info(
+        "Startup: imports %.0f ms, routers %.0f ms, db %.0f ms (schema v%s, %s)",
+        startup_timings["imports_ms"],
+        startup_timings["routers_ms"],
+        startup_timings["db_ms"],
+        schema["to"],
+        f"{len(schema['applied'])} migration step(s)" if schema["applied"] else "no DDL",
+    )
     yield
+    if async_engine is not None:
+        await async_engine.dispose()
 
 
+_routers_start = time.perf_counter()
 app = FastAPI(title="xpendsTracker API", redirect_slashes=False, lifespan=lifespan)
 
+# In debug mode every response carries the number of SQL statements it issued
+DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+
+
+class QueryCountHeader:
+    """Adds X-Query-Count when DEBUG is on (read per request, so tests can flip it).
+
+    Plain ASGI rather than @app.middleware("http"): with DEBUG off a request
+    goes straight through, without the extra task and response wrapping of
+    BaseHTTPMiddleware.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not DEBUG:
+            await self.app(scope, receive, send)
+            return
+
+        with count_queries() as counter:
+            async def send_with_count(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = [*message.get("headers", []), (b"x-query-count", str(counter[0]).encode())]
+                await send(message)
+
+            await self.app(scope, receive, send_with_count)
+
+
+app.add_middleware(QueryCountHeader)
+
+
 allowed_origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:5173").split(",")
 app.add_middleware(
     CORSMiddleware,
@@ -35,8 +86,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Query-Count"],
 )
 
+if ASYNC_DB:
+    # Registered first so they win; anything without an async twin falls
+    # through to the sync routers below.
+    from routes.async_expenses import router as async_expenses_router
+    from routes.async_users import router as async_users_router
+    from routes.async_categories import router as async_categories_router
+    from routes.async_persons import router as async_persons_router
+
+    app.include_router(async_users_router)
+    app.include_router(async_expenses_router)
+    app.include_router(async_categories_router)
+    app.include_router(async_persons_router)
+
 app.include_router(auth_router)
 app.include_router(users_router)
 app.include_router(expenses_router)
@@ -44,20 +109,13 @@ app.include_router(categories_router)
 app.include_router(persons_router)
 app.include_router(scan_router)
 
-# Serve the Vite-built React SPA in production
+# Serve the Vite-built React SPA in production, from memory (see spa.py)
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
 if os.path.isdir(STATIC_DIR):
-    assets_dir = os.path.join(STATIC_DIR, "assets")
-    if os.path.isdir(assets_dir):
-        app.mount("/assets", StaticFiles(directory=assets_dir), name="assets")
-
-    @app.get("/{full_path:path}", include_in_schema=False)
-    async def serve_spa(full_path: str):
-        file_path = os.path.join(STATIC_DIR, full_path)
-        if full_path and os.path.isfile(file_path):
-            return FileResponse(file_path)
-        return FileResponse(os.path.join(STATIC_DIR, "index.html"))
+    spa.mount(app, STATIC_DIR)
 else:
     @app.get("/")
     def root():
         return {"message": "xpendsTracker API is running"}
+
+startup_timings["routers_ms"] = (time.perf_counter() - _routers_start) * 1000
@@ -0,0 +1,200 @@
+"""
+Usage:
+    python migrations.py            # upgrade to the latest schema
+    python migrations.py status     # print the current and latest version
+
+Versioned schema migrations. The schema_version table holds a single row
+with the number of the last migration applied. On boot, main.lifespan calls
+upgrade(), which reads that row with one query and does no DDL when the
+schema is already current.
+
+A fresh database is built with create_all() and stamped with the latest
+version. Databases from before versioning (tables present, no
+schema_version) run every migration; the steps check before they change
+anything, so they are safe on a schema that already has some of them.
+
+To change the schema, update models.py and append a step to MIGRATIONS.
+"""
+import datetime
+import logging
+import sys
+import time
+
+from sqlalchemy import Column, Integer, Table, bindparam, inspect, select, text, update
+from sqlalchemy.exc import DBAPIError
+
+import rollups
+import search
+from database import Base, engine
+from models import Category, CollectionVersion, Expense, ExpenseRollup, ExpenseTombstone, Person
+from receipt_parser import canonical_rut
+
+logger = logging.getLogger("uvicorn.error")
+
+schema_version = Table("schema_version", Base.metadata, Column("version", Integer, nullable=False))
+
+# Serializes concurrent boots (several Cloud Run instances) on Postgres
+_PG_LOCK_ID = 0x78706E64  # "xpnd"
+
+
+def _add_column(conn, table: str, name: str, ddl: str):
+    if name not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+
+def _create_index(conn, table, name: str):
+    # By name: a table's later indexes may cover columns an older step predates
+    index = next(index for index in table.indexes if index.name == name)
+    index.create(conn, checkfirst=True)
+
+
+def _persons_relation(conn):
+    _add_column(conn, "persons", "relation", "TEXT")
+
+
+def _expense_keyset_index(conn):
+    _create_index(conn, Expense.__table__, "ix_expenses_user_date_id")
+
+
+def _expense_rollups(conn):
+    if not inspect(conn).has_table(ExpenseRollup.__tablename__):
+        ExpenseRollup.__table__.create(conn)
+        rollups.rebuild(conn)  # seed from the existing expenses
+
+
+def _collection_versions(conn):
+    CollectionVersion.__table__.create(conn, checkfirst=True)
+
+
+def _expense_change_tracking(conn):
+    _add_column(conn, "expenses", "updated_at", "TIMESTAMP")
+    _add_column(conn, "expenses", "change_seq", "INTEGER NOT NULL DEFAULT 0")
+    _create_index(conn, Expense.__table__, "ix_expenses_user_change_id")
+    ExpenseTombstone.__table__.create(conn, checkfirst=True)
+
+
+def _expense_search(conn):
+    # Not part of the metadata; create() is a no-op on dialects without an index
+    search.create(conn)
+    search.reindex(conn)
+
+
+def _person_rut_canonical(conn):
+    _add_column(conn, "persons", "rut_canonical", "TEXT")
+    rows = conn.execute(select(Person.id, Person.rut).where(Person.rut_canonical.is_(None))).all()
+    values = [{"pid": pid, "canonical": canonical_rut(rut)} for pid, rut in rows if canonical_rut(rut)]
+    if values:
+        conn.execute(
+            update(Person).where(Person.id == bindparam("pid")).values(rut_canonical=bindparam("canonical")),
+            values,
+        )
+    _create_index(conn, Person.__table__, "ix_persons_user_rut")
+
+
+def _foreign_key_indexes(conn):
+    _create_index(conn, Expense.__table__, "ix_expenses_provider_id")
+    _create_index(conn, Expense.__table__, "ix_expenses_recipient_id")
+    _create_index(conn, Category.__table__, "ix_categories_user_name")
+    _create_index(conn, Person.__table__, "ix_persons_user_name")
+
+
+def _expense_updated_at(conn):
+    # Rows from before change tracking (step 5) have no write time; their
+    # own date is the closest thing to one
+    rows = conn.execute(select(Expense.id, Expense.date).where(Expense.updated_at.is_(None))).all()
+    values = [
+        {"eid": eid, "written": datetime.datetime.combine(date or datetime.date.today(), datetime.time())}
+        for eid, date in rows
+    ]
+    if values:
+        conn.execute(
+            update(Expense).where(Expense.id == bindparam("eid")).values(updated_at=bindparam("written")),
+            values,
+        )
+
+
+def _expense_search_unaccent(conn):
+    # Postgres documents built by step 6 kept their accents; rebuild them
+    # through unaccent. FTS5 already folded them.
+    if conn.dialect.name == "postgresql":
+        search.create(conn)
+        search.reindex(conn)
+
+
+# (version, description, step). Append only; never renumber.
+MIGRATIONS = [
+    (1, "persons.relation", _persons_relation),
+    (2, "expenses (user_id, date, id) index", _expense_keyset_index),
+    (3, "expense_rollups table, seeded", _expense_rollups),
+    (4, "collection_versions table", _collection_versions),
+    (5, "expenses updated_at/change_seq and tombstones", _expense_change_tracking),
+    (6, "expense full-text search index, built", _expense_search),
+    (7, "persons.rut_canonical, backfilled and indexed", _person_rut_canonical),
+    (8, "indexes on expense persons and per-user category/person lists", _foreign_key_indexes),
+    (9, "expenses.updated_at backfilled for pre-tracking rows", _expense_updated_at),
+    (10, "expense search folds accents on Postgres, rebuilt", _expense_search_unaccent),
+]
+LATEST = MIGRATIONS[-1][0]
+
+
+def current_version(conn) -> int | None:
+    """The applied version, 0 for a pre-versioning schema, None for an empty database."""
+    if inspect(conn).has_table(schema_version.name):
+        return conn.execute(select(schema_version.c.version)).scalar() or 0
+    return 0 if inspect(conn).has_table("users") else None
+
+
+def _read_version(target_engine) -> int | None:
+    # The common case: one SELECT. Missing table -> fall back to inspection.
+    try:
+        with target_engine.connect() as conn:
+            return conn.execute(select(schema_version.c.version)).scalar()
+    except DBAPIError:
+        return None
+
+
+def _set_version(conn, version: int):
+    if conn.execute(update(schema_version).values(version=version)).rowcount == 0:
+        conn.execute(schema_version.insert().values(version=version))
+
+
+def upgrade(target_engine=engine) -> dict:
+    """Bring the schema to LATEST; return what was done and how long it took."""
+    start = time.perf_counter()
+    if _read_version(target_engine) == LATEST:
+        return {"from": LATEST, "to": LATEST, "applied": [], "ms": (time.perf_counter() - start) * 1000}
+
+    applied = []
+    with target_engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _PG_LOCK_ID})
+        found = current_version(conn)  # re-read: another instance may have finished
+        if found is None:
+            Base.metadata.create_all(conn)
+            applied.append("create_all")
+        else:
+            schema_version.create(conn, checkfirst=True)
+            for version, description, step in MIGRATIONS:
+                if version > found:
+                    step(conn)
+                    applied.append(f"{version}: {description}")
+        if found != LATEST:
+            _set_version(conn, LATEST)
+
+    for entry in applied:
+        logger.info("Schema migration applied: %s", entry)
+    return {"from": found, "to": LATEST, "applied": applied, "ms": (time.perf_counter() - start) * 1000}
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["status"]:
+        with engine.connect() as _conn:
+            print(f"Schema version: {current_version(_conn)} (latest {LATEST})")
+    elif sys.argv[1:]:
+        print("Usage: python migrations.py [status]")
+        sys.exit(1)
+    else:
+        result = upgrade()
+        for entry in result["applied"]:
+            print(f"✓ {entry}")
+        print(f"✓ Schema at version {result['to']} ({result['ms']:.0f} ms)")
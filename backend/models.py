@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, Date, Boolean, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, Date, Boolean, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship, validates
 from database import Base
+from receipt_parser import canonical_rut
 import datetime
 
 
@@ -44,11 +45,63 @@ class Expense(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     provider_id = Column(Integer, ForeignKey("persons.id"), nullable=False)
     recipient_id = Column(Integer, ForeignKey("persons.id"), nullable=False)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Owner's "expenses" version (versions.py) as of this row's last write
+    change_seq = Column(Integer, nullable=False, default=0)
 
     owner = relationship("User", back_populates="expenses")
     provider = relationship("Person", foreign_keys=[provider_id])
     recipient = relationship("Person", foreign_keys=[recipient_id])
 
+    __table_args__ = (
+        # Backs the keyset pagination in GET /expenses: (date desc, id desc) per user
+        Index("ix_expenses_user_date_id", "user_id", "date", "id"),
+        # Backs GET /expenses/changes: rows changed after a (change_seq, id) cursor
+        Index("ix_expenses_user_change_id", "user_id", "change_seq", "id"),
+        # Expenses of a person: the search reindex on rename, and Postgres'
+        # FK check when a person is deleted. user_id leads the indexes above.
+        Index("ix_expenses_provider_id", "provider_id"),
+        Index("ix_expenses_recipient_id", "recipient_id"),
+    )
+
+
+class ExpenseTombstone(Base):
+    """A deleted expense, kept so delta sync clients can drop their copy."""
+    __tablename__ = "expense_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    expense_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    change_seq = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_expense_tombstones_user_change", "user_id", "change_seq", "expense_id"),
+    )
+
+
+class ExpenseRollup(Base):
+    """Per-user monthly totals by category, kept in step by rollups.py."""
+    __tablename__ = "expense_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    year_month = Column(Integer, primary_key=True)  # YYYYMM, e.g. 202403
+    category = Column(String, primary_key=True)
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class CollectionVersion(Base):
+    """Write counter per user and collection, used as the list ETag (versions.py).
+
+    Rows are never deleted, so the counter only moves forward.
+    """
+    __tablename__ = "collection_versions"
+
+    user_id = Column(Integer, primary_key=True)
+    collection = Column(String, primary_key=True)  # "expenses", "categories", "persons"
+    version = Column(Integer, nullable=False, default=0)
+
 
 class Category(Base):
     __tablename__ = "categories"
@@ -60,6 +113,11 @@ class Category(Base):
 
     owner = relationship("User", back_populates="categories")
 
+    __table_args__ = (
+        # GET /categories: one user's, by name
+        Index("ix_categories_user_name", "user_id", "name"),
+    )
+
 
 class Person(Base):
     __tablename__ = "persons"
@@ -68,7 +126,21 @@ class Person(Base):
     name = Column(String, nullable=False)
     type = Column(String, nullable=False)
     rut = Column(String, nullable=False)
+    # canonical_rut(rut), kept in step by the validator below; NULL if malformed
+    rut_canonical = Column(String, nullable=True)
     relation = Column(String, nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
     owner = relationship("User", foreign_keys=[user_id], back_populates="persons")
+
+    __table_args__ = (
+        # GET /persons: one user's, by name
+        Index("ix_persons_user_name", "user_id", "name"),
+        # GET /persons/by-rut and scan matching
+        Index("ix_persons_user_rut", "user_id", "rut_canonical"),
+    )
+
+    @validates("rut")
+    def _canonicalize_rut(self, key, value):
+        self.rut_canonical = canonical_rut(value) if value is not None else None
+        return value
@@ -0,0 +1,219 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from fastapi import HTTPException, status
+
+OCR_BACKEND = os.getenv("OCR_BACKEND", "vision")  # vision | tesseract | fixture
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "4"))
+OCR_QUEUE_DEPTH = int(os.getenv("OCR_QUEUE_DEPTH", "16"))
+OCR_TIMEOUT_SECONDS = float(os.getenv("OCR_TIMEOUT_SECONDS", "30"))
+OCR_FIXTURE_DIR = os.getenv("OCR_FIXTURE_DIR")
+OCR_FIXTURE_LATENCY_MS = int(os.getenv("OCR_FIXTURE_LATENCY_MS", "0"))
+OCR_PDF_MAX_PAGES = int(os.getenv("OCR_PDF_MAX_PAGES", "20"))
+
+# Separates page texts in merged multi-page OCR output (same as Tesseract)
+PAGE_BREAK = "\f"
+
+
+# ── Backends ──────────────────────────────────────────
+
+class OcrBackend:
+    """Turns an uploaded image or PDF into plain text. Implementations block."""
+
+    name = "base"
+    # How many images one extract_batch call may take; 1 = no native batching
+    batch_size = 1
+    # Pages one extract_pdf_pages call may take; 0 = PDFs go through extract_text
+    pdf_pages_per_call = 0
+
+    def extract_text(self, content: bytes, mime_type: str) -> str:
+        raise NotImplementedError
+
+    def extract_pdf_pages(self, content: bytes, pages: list[int]) -> tuple[list[str], int]:
+        """OCR the given 1-based PDF pages and return their texts plus the document's page count.
+
+        An empty ``pages`` list means the first ``pdf_pages_per_call`` pages.
+        """
+        raise NotImplementedError
+
+    def extract_batch(self, items: list[tuple[bytes, str]]) -> list:
+        """OCR several images in one call.
+
+        Results line up with ``items``; a file that failed is returned as the
+        Exception instance instead of text.
+        """
+        results = []
+        for content, mime_type in items:
+            try:
+                results.append(self.extract_text(content, mime_type))
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+class VisionBackend(OcrBackend):
+    """Google Cloud Vision document text detection (the production backend)."""
+
+    name = "vision"
+    batch_size = 16  # batch_annotate_images accepts up to 16 images per request
+    pdf_pages_per_call = 5  # batch_annotate_files reads at most 5 pages per file request
+
+    @property
+    def client(self):
+        return _vision_client()
+
+    def extract_text(self, content: bytes, mime_type: str) -> str:
+        from google.cloud import vision
+
+        if mime_type == "application/pdf":
+            texts, _ = self.extract_pdf_pages(content, [])
+            return PAGE_BREAK.join(texts)
+
+        image = vision.Image(content=content)
+        resp = self.client.document_text_detection(image=image)
+        annotation = resp.full_text_annotation
+        return annotation.text if annotation else ""
+
+    def extract_pdf_pages(self, content: bytes, pages: list[int]) -> tuple[list[str], int]:
+        from google.cloud import vision
+
+        input_config = vision.InputConfig(content=content, mime_type="application/pdf")
+        feature = vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)
+        file_req = vision.AnnotateFileRequest(
+            input_config=input_config, features=[feature], pages=pages
+        )
+        file_resp = self.client.batch_annotate_files(requests=[file_req]).responses[0]
+        texts = [
+            r.full_text_annotation.text if r.full_text_annotation else ""
+            for r in file_resp.responses
+        ]
+        return texts, file_resp.total_pages
+
+    def extract_batch(self, items: list[tuple[bytes, str]]) -> list:
+        from google.cloud import vision
+
+        feature = vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)
+        requests = [
+            vision.AnnotateImageRequest(image=vision.Image(content=content), features=[feature])
+            for content, _ in items
+        ]
+        resp = self.client.batch_annotate_images(requests=requests)
+        results = []
+        for image_resp in resp.responses:
+            if image_resp.error.message:
+                results.append(RuntimeError(image_resp.error.message))
+            else:
+                annotation = image_resp.full_text_annotation
+                results.append(annotation.text if annotation else "")
+        return results
+
+
+@lru_cache(maxsize=1)
+def _vision_client():
+    # Building the client loads credentials and opens a gRPC channel; do it once
+    from google.cloud import vision
+    return vision.ImageAnnotatorClient()
+
+
+class TesseractBackend(OcrBackend):
+    """Local OCR through pytesseract; PDFs additionally need pdf2image."""
+
+    name = "tesseract"
+    pdf_pages_per_call = 2
+
+    def __init__(self, lang: str = "spa"):
+        self.lang = lang
+
+    def extract_text(self, content: bytes, mime_type: str) -> str:
+        import io
+        import pytesseract
+        from PIL import Image
+
+        if mime_type == "application/pdf":
+            texts, _ = self.extract_pdf_pages(content, [1])
+            return PAGE_BREAK.join(texts)
+        return pytesseract.image_to_string(Image.open(io.BytesIO(content)), lang=self.lang)
+
+    def extract_pdf_pages(self, content: bytes, pages: list[int]) -> tuple[list[str], int]:
+        import pytesseract
+        from pdf2image import convert_from_bytes, pdfinfo_from_bytes
+
+        total = pdfinfo_from_bytes(content)["Pages"]
+        pages = pages or list(range(1, self.pdf_pages_per_call + 1))
+        images = convert_from_bytes(content, first_page=min(pages), last_page=min(max(pages), total))
+        return [pytesseract.image_to_string(img, lang=self.lang) for img in images], total
+
+
+class FixtureBackend(OcrBackend):
+    """Deterministic stand-in for offline tests and load tests.
+
+    Returns ``<sha256>.txt`` from ``fixture_dir`` when present, otherwise
+    ``default_text``; ``latency_ms`` simulates a remote OCR round trip.
+    """
+
+    name = "fixture"
+    DEFAULT_TEXT = "BOLETA ELECTRONICA\nRUT: 76.123.456-0\nRazón Social: Comercial Demo SpA\nTotal $1.000\n"
+
+    def __init__(self, fixture_dir: str | None = None, latency_ms: int = 0, default_text: str = DEFAULT_TEXT):
+        self.fixture_dir = fixture_dir
+        self.latency_ms = latency_ms
+        self.default_text = default_text
+
+    def extract_text(self, content: bytes, mime_type: str) -> str:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if self.fixture_dir:
+            path = os.path.join(self.fixture_dir, f"{hashlib.sha256(content).hexdigest()}.txt")
+            if os.path.isfile(path):
+                with open(path, encoding="utf-8") as f:
+                    return f.read()
+        return self.default_text
+
+
+@lru_cache(maxsize=1)
+def get_backend() -> OcrBackend:
+    if OCR_BACKEND == "vision":
+        return VisionBackend()
+    if OCR_BACKEND == "tesseract":
+        return TesseractBackend()
+    if OCR_BACKEND == "fixture":
+        return FixtureBackend(OCR_FIXTURE_DIR, OCR_FIXTURE_LATENCY_MS)
+    raise ValueError(f"Unknown OCR_BACKEND '{OCR_BACKEND}'")
+
+
+# ── Bounded executor ──────────────────────────────────
+
+class OcrPool:
+    """Runs blocking OCR calls off the event loop.
+
+    ``workers + queue_depth`` slots cover running and waiting jobs; once they
+    are taken new calls fail fast with 503. A call that outlives ``timeout``
+    answers 504, and its slot is only released when the worker finishes, so
+    slow backends cannot pile up unbounded work.
+    """
+
+    def __init__(self, workers: int, queue_depth: int, timeout: float):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr")
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="OCR is busy, please retry shortly",
+                headers={"Retry-After": "2"},
+            )
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="OCR timed out")
+
+
+ocr_pool = OcrPool(OCR_WORKERS, OCR_QUEUE_DEPTH, OCR_TIMEOUT_SECONDS)
@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", "256"))
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR")  # unset = memory tier only
+OCR_CACHE_DISK_MAX_BYTES = int(os.getenv("OCR_CACHE_DISK_MAX_MB", "512")) * 1024 * 1024
+# An eviction pass frees down to this fraction of the limit, so puts at the
+# limit do not each trigger one
+_DISK_LOW_WATER = 0.9
+
+
+class OcrCache:
+    """Content-addressed cache of OCR text.
+
+    Keys are the SHA-256 of the backend, mime type and file bytes, so re-uploads of the
+    same receipt hit regardless of filename. An in-memory LRU sits in front of
+    an optional on-disk tier that evicts least-recently-used files once it
+    grows past ``disk_max_bytes``.
+
+    The disk tier keeps a running byte total, so a put costs one write; the
+    directory is only listed on first use and when the total crosses the
+    limit (which also corrects drift from other processes sharing it).
+    Async callers use ``aget``/``aput``, which serve memory hits inline and
+    run disk I/O in a worker thread.
+    """
+
+    def __init__(self, max_entries: int, disk_dir: str | None = None, disk_max_bytes: int = 0):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk_bytes: int | None = None  # unknown until the first put lists the directory
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def key(content: bytes, mime_type: str, namespace: str = "") -> str:
+        # namespace (the OCR backend) keeps results of different engines apart
+        digest = hashlib.sha256(f"{namespace}:{mime_type}".encode())
+        digest.update(b"\0")
+        digest.update(content)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> str | None:
+        text = self._memory_get(key)
+        if text is None:
+            text = self._found(key, self._disk_get(key))
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._remember(key, text)
+        self._disk_put(key, text)
+
+    async def aget(self, key: str) -> str | None:
+        text = self._memory_get(key)
+        if text is None:
+            disk_text = await asyncio.to_thread(self._disk_get, key) if self.disk_dir else None
+            text = self._found(key, disk_text)
+        return text
+
+    async def aput(self, key: str, text: str) -> None:
+        with self._lock:
+            self._remember(key, text)
+        if self.disk_dir:
+            await asyncio.to_thread(self._disk_put, key, text)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._memory)}
+
+    def _memory_get(self, key: str) -> str | None:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+        return None
+
+    def _found(self, key: str, disk_text: str | None) -> str | None:
+        """Count the outcome of a lookup that missed memory."""
+        with self._lock:
+            if disk_text is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, disk_text)
+        return disk_text
+
+    def _remember(self, key: str, text: str) -> None:
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    # ── Disk tier ─────────────────────────────────────
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.txt")
+
+    def _disk_get(self, key: str) -> str | None:
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+            os.utime(path)  # mtime doubles as last-access time for eviction
+            return text
+        except OSError:
+            return None
+
+    def _disk_put(self, key: str, text: str) -> None:
+        if not self.disk_dir:
+            return
+        data = text.encode("utf-8")
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk()[1]
+            try:
+                replaced = os.stat(path).st_size
+            except OSError:
+                replaced = 0
+            try:
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)  # atomic, so readers never see partial files
+            except OSError:
+                return
+            self._disk_bytes += len(data) - replaced
+            if self._disk_bytes > self.disk_max_bytes:
+                self._evict_disk()
+
+    def _scan_disk(self) -> tuple[list, int]:
+        """(mtime, size, path) of every cached file, and their total size."""
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".txt"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries, sum(size for _, size, _ in entries)
+
+    def _evict_disk(self) -> None:
+        entries, total = self._scan_disk()
+        target = self.disk_max_bytes * _DISK_LOW_WATER
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+
+ocr_cache = OcrCache(OCR_CACHE_SIZE, OCR_CACHE_DIR, OCR_CACHE_DISK_MAX_BYTES)
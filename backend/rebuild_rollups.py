@@ -0,0 +1,48 @@
+"""
+Usage:
+    python rebuild_rollups.py [--verify] [username]
+
+Recomputes the monthly expense rollups (expense_rollups) from the expenses
+table, for every user or just the given one. With --verify nothing is
+written: mismatching buckets are listed and the exit status is 1 if any.
+"""
+import sys
+import rollups
+from database import SessionLocal
+from models import User
+
+args = sys.argv[1:]
+verify_only = "--verify" in args
+args = [a for a in args if a != "--verify"]
+if len(args) > 1 or any(a.startswith("-") for a in args):
+    print("Usage: python rebuild_rollups.py [--verify] [username]")
+    sys.exit(1)
+
+db = SessionLocal()
+
+user_id = None
+if args:
+    user = db.query(User).filter(User.username == args[0]).first()
+    if not user:
+        print(f"User '{args[0]}' not found.")
+        db.close()
+        sys.exit(1)
+    user_id = user.id
+
+if verify_only:
+    mismatches = rollups.verify(db, user_id)
+    for m in mismatches:
+        print(
+            f"✗ user {m['user_id']} {m['year_month']} {m['category']}: "
+            f"stored {m['stored']['total']:.2f} ({m['stored']['count']}), "
+            f"expected {m['computed']['total']:.2f} ({m['computed']['count']})"
+        )
+    if not mismatches:
+        print("✓ Rollups match the expenses table")
+    db.close()
+    sys.exit(1 if mismatches else 0)
+
+buckets = rollups.rebuild(db, user_id)
+db.commit()
+print(f"✓ Rebuilt {buckets} rollup buckets")
+db.close()
@@ -0,0 +1,115 @@
+"""Field extraction for OCR'd Chilean boletas and facturas.
+
+Every pattern is compiled once at import. The labeled fields (total and
+issuer name) are matched against one lowercased copy of the text, with
+patterns that start with a literal so ``re`` can skip ahead to candidate
+characters instead of trying every offset; a single pass over the totals
+picks the winning page. RUTs are located from their hyphen, which OCR text
+rarely contains, rather than by trying a digit pattern at every number.
+"""
+import re
+from bisect import bisect_right
+
+from ocr import PAGE_BREAK
+
+# Labeled total. CLP uses dots as thousands separators, no decimals
+_TOTAL = re.compile(
+    r"(?:total|monto total|a pagar|importe neto|importe)[\s:$]*"
+    r"(?:(?P<dotted>[0-9]{1,3}(?:\.[0-9]{3})+)|(?P<plain>[0-9]{2,}))"
+)
+
+# Labeled issuer: "Razón Social: ...", "Nombre: ...", "Emisor: ..."
+_LABELED_NAME = re.compile(r"(?:raz[oó]n social|nombre|emisor)[:\s]+([a-záéíóúñ][^\n\f]{3,60})")
+
+# Fallback issuer: all-caps line ending with a company legal suffix
+_COMPANY_SUFFIXES = ("LTDA", "S.A.", "S.P.A.", "EIRL", "SpA")
+_COMPANY = re.compile(r"[A-ZÁÉÍÓÚÑ]{2,}[^\n\f]{0,55}(?:LTDA|S\.A\.|S\.P\.A\.|EIRL|SpA)")
+
+# Chilean RUT: XX.XXX.XXX-X or XXXXXXXX-X
+_RUT = re.compile(r"\d{1,2}\.?\d{3}\.?\d{3}-[\dkK]")
+_RUT_BODY_CHARS = frozenset("0123456789.")
+
+
+def _is_word_char(text: str, i: int) -> bool:
+    return 0 <= i < len(text) and (text[i].isalnum() or text[i] == "_")
+
+
+def rut_is_valid(rut: str) -> bool:
+    """Check a RUT's verifier digit (modulo 11)."""
+    body, _, verifier = rut.replace(".", "").upper().partition("-")
+    if not body.isdigit() or len(verifier) != 1:
+        return False
+    total = sum(int(d) * (2 + i % 6) for i, d in enumerate(reversed(body)))
+    expected = {11: "0", 10: "K"}.get(11 - total % 11, str(11 - total % 11))
+    return verifier == expected
+
+
+def canonical_rut(rut: str) -> str | None:
+    """Digits plus verifier, without dots, hyphen or leading zeros: "76.123.456-7" -> "761234567".
+
+    None when ``rut`` is not shaped like a RUT; the verifier is not checked.
+    """
+    compact = rut.replace(".", "").replace("-", "").replace(" ", "").upper()
+    body, verifier = compact[:-1], compact[-1:]
+    if not (body.isascii() and body.isdigit()) or len(verifier) != 1 or verifier not in "0123456789K":
+        return None
+    return (body.lstrip("0") or "0") + verifier
+
+
+def _find_rut(text: str) -> str | None:
+    # Walk back from each hyphen over the digits and dots before it; the
+    # run must be a whole word and have a valid verifier digit.
+    hyphen = text.find("-")
+    while hyphen != -1:
+        start = hyphen
+        while start and text[start - 1] in _RUT_BODY_CHARS:
+            start -= 1
+        # A run can start with a label's dot ("R.U.T.76.123.456-0")
+        while start < hyphen and text[start] == ".":
+            start += 1
+        if not _is_word_char(text, start - 1) and not _is_word_char(text, hyphen + 2):
+            m = _RUT.fullmatch(text, start, hyphen + 2)
+            if m and rut_is_valid(m.group()):
+                return m.group()
+        hyphen = text.find("-", hyphen + 1)
+    return None
+
+
+def extract_fields(text: str) -> dict:
+    """Return ``amount``, ``rut`` and ``provider_name`` found in ``text``.
+
+    - rut: first RUT whose verifier digit is correct.
+    - amount: the total on the last page that has one; within a page a
+      dotted amount ("5.500") beats a plain one, then the earliest wins.
+    - provider_name: first labeled issuer, else first company-suffix line.
+    """
+    lowered = text.lower()
+    # Offsets into ``lowered`` map back onto ``text`` unless lowercasing
+    # changed the length (e.g. "İ"), in which case names come out lowercased.
+    same_offsets = len(lowered) == len(text)
+    breaks = (
+        [m.start() for m in re.finditer(PAGE_BREAK, lowered)] if PAGE_BREAK in lowered else None
+    )
+    amount_key = amount = None
+    for m in _TOTAL.finditer(lowered):
+        if _is_word_char(lowered, m.start() - 1):  # "subtotal", "importes"
+            continue
+        kind = m.lastgroup
+        key = (bisect_right(breaks, m.start()) if breaks else 0, kind == "dotted", -m.start())
+        if amount_key is None or key > amount_key:
+            amount_key = key
+            amount = float(m.group(kind).replace(".", ""))
+
+    name = None
+    for m in _LABELED_NAME.finditer(lowered):
+        start, end = m.span(1)
+        name = (text[start:end] if same_offsets else m.group(1)).strip()
+        if name:
+            break
+
+    if not name and any(suffix in text for suffix in _COMPANY_SUFFIXES):
+        m = _COMPANY.search(text)
+        if m:
+            name = m.group().strip()
+
+    return {"amount": amount, "rut": _find_rut(text), "provider_name": name or None}
@@ -0,0 +1,173 @@
+"""Monthly expense rollups (models.ExpenseRollup), maintained incrementally.
+
+ORM writes to Expense are picked up by a before_flush hook on every Session
+(the async session runs on the same class), which folds the flush's inserts,
+updates and deletes into a single upsert executed in the same transaction.
+Core-level bulk writes bypass the ORM and must call apply_deltas themselves.
+"""
+import datetime
+from sqlalchemy import Integer, cast, delete, event, func, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from database import UPSERT_INSERTS
+from models import Expense, ExpenseRollup, User
+
+# Float sums drift slightly depending on the order amounts were added in
+VERIFY_TOLERANCE = 0.005
+
+_BUCKET_FIELDS = ("user_id", "date", "category", "amount")
+
+
+def year_month(date: datetime.date) -> int:
+    return date.year * 100 + date.month
+
+
+def add_delta(deltas: dict, user_id: int, date: datetime.date, category: str, amount: float, count: int):
+    """Accumulate a change to one (user_id, year_month, category) bucket."""
+    key = (user_id, year_month(date), category)
+    total, n = deltas.get(key, (0.0, 0))
+    deltas[key] = (total + amount, n + count)
+
+
+def row_deltas(rows) -> dict:
+    """Deltas for newly inserted expense rows given as column dicts."""
+    deltas = {}
+    for row in rows:
+        add_delta(deltas, row["user_id"], row["date"], row["category"], row["amount"], 1)
+    return deltas
+
+
+def apply_deltas(connection, deltas: dict):
+    values = [
+        {"user_id": u, "year_month": ym, "category": c, "total": t, "count": n}
+        for (u, ym, c), (t, n) in deltas.items()
+        if t or n  # e.g. a title-only edit
+    ]
+    if not values:
+        return
+    dialect_insert = UPSERT_INSERTS.get(connection.dialect.name)
+    if dialect_insert is None:
+        _apply_portable(connection, values)
+        return
+    stmt = dialect_insert(ExpenseRollup).values(values)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=[ExpenseRollup.user_id, ExpenseRollup.year_month, ExpenseRollup.category],
+        set_={
+            "total": ExpenseRollup.total + stmt.excluded.total,
+            "count": ExpenseRollup.count + stmt.excluded.count,
+        },
+    ))
+
+
+def _apply_portable(connection, values: list):
+    # Backends without ON CONFLICT: bump existing buckets, insert the rest
+    for row in values:
+        result = connection.execute(
+            update(ExpenseRollup)
+            .where(
+                ExpenseRollup.user_id == row["user_id"],
+                ExpenseRollup.year_month == row["year_month"],
+                ExpenseRollup.category == row["category"],
+            )
+            .values(total=ExpenseRollup.total + row["total"], count=ExpenseRollup.count + row["count"])
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(ExpenseRollup).values(row))
+
+
+def _committed(expense: Expense) -> tuple:
+    """The bucket fields as they are in the database, before this flush."""
+    state = inspect(expense)
+    values = []
+    for field in _BUCKET_FIELDS:
+        history = state.attrs[field].history
+        if history.deleted:
+            values.append(history.deleted[0])
+        elif history.unchanged:
+            values.append(history.unchanged[0])
+        else:
+            values.append(getattr(expense, field))  # expired: loads the stored value
+    return tuple(values)
+
+
+def _current(expense: Expense) -> tuple:
+    return tuple(getattr(expense, field) for field in _BUCKET_FIELDS)
+
+
+@event.listens_for(Session, "before_flush")
+def _track_expense_writes(session, flush_context, instances):
+    deltas = {}
+    deleted_users = {obj.id for obj in session.deleted if isinstance(obj, User)}
+
+    for obj in session.new:
+        if isinstance(obj, Expense):
+            user_id, date, category, amount = _current(obj)
+            add_delta(deltas, user_id, date or datetime.date.today(), category, amount, 1)
+    for obj in session.dirty:
+        if isinstance(obj, Expense) and session.is_modified(obj):
+            old, new = _committed(obj), _current(obj)
+            if old != new:
+                add_delta(deltas, *old[:3], -old[3], -1)
+                add_delta(deltas, *new[:3], new[3], 1)
+    for obj in session.deleted:
+        if isinstance(obj, Expense):
+            old = _committed(obj)
+            if old[0] not in deleted_users:
+                add_delta(deltas, *old[:3], -old[3], -1)
+
+    if not deltas and not deleted_users:
+        return
+    connection = session.connection()
+    if deleted_users:
+        # Their expenses go with them; drop the buckets rather than zero them
+        connection.execute(delete(ExpenseRollup).where(ExpenseRollup.user_id.in_(deleted_users)))
+    apply_deltas(connection, deltas)
+
+
+# ── Rebuild / verify ──────────────────────────────────
+
+def _computed_statement(user_id: int | None = None):
+    ym = cast(func.extract("year", Expense.date) * 100 + func.extract("month", Expense.date), Integer)
+    stmt = (
+        select(Expense.user_id, ym, Expense.category, func.sum(Expense.amount), func.count(Expense.id))
+        .group_by(Expense.user_id, ym, Expense.category)
+    )
+    return stmt.where(Expense.user_id == user_id) if user_id is not None else stmt
+
+
+def rebuild(db: Session, user_id: int | None = None) -> int:
+    """Recompute rollups from the expenses table; returns the bucket count."""
+    scope = [ExpenseRollup.user_id == user_id] if user_id is not None else []
+    db.execute(delete(ExpenseRollup).where(*scope))
+    db.execute(insert(ExpenseRollup).from_select(
+        ["user_id", "year_month", "category", "total", "count"],
+        _computed_statement(user_id),
+    ))
+    return db.scalar(select(func.count()).select_from(ExpenseRollup).where(*scope))
+
+
+def verify(db: Session, user_id: int | None = None) -> list[dict]:
+    """Buckets whose stored totals differ from a fresh aggregation."""
+    scope = [ExpenseRollup.user_id == user_id] if user_id is not None else []
+    stored = {
+        (u, ym, c): (t, n)
+        for u, ym, c, t, n in db.execute(
+            select(
+                ExpenseRollup.user_id, ExpenseRollup.year_month, ExpenseRollup.category,
+                ExpenseRollup.total, ExpenseRollup.count,
+            ).where(ExpenseRollup.count != 0, *scope)
+        )
+    }
+    computed = {(u, int(ym), c): (t, n) for u, ym, c, t, n in db.execute(_computed_statement(user_id))}
+
+    mismatches = []
+    for key in sorted(stored.keys() | computed.keys()):
+        have, want = stored.get(key, (0.0, 0)), computed.get(key, (0.0, 0))
+        if have[1] != want[1] or abs(have[0] - want[0]) > VERIFY_TOLERANCE:
+            user, ym, category = key
+            mismatches.append({
+                "user_id": user, "year_month": ym, "category": category,
+                "stored": {"total": have[0], "count": have[1]},
+                "computed": {"total": want[0], "count": want[1]},
+            })
+    return mismatches
@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+import versions
+from database import get_async_db
+from models import Category, User
+from schemas import CategoryCreate, CategoryOut
+from auth import get_current_user_async
+from routes.categories import category_list
+
+# Async-mode twin of routes/categories.py (enabled with ASYNC_DB=true)
+router = APIRouter(prefix="/categories", tags=["categories"])
+
+
+async def _owned_category(db: AsyncSession, category_id: int, current_user: User) -> Category:
+    db_category = await db.get(Category, category_id)
+    if not db_category:
+        raise HTTPException(status_code=404, detail="Category not found")
+    if db_category.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return db_category
+
+
+@router.get("", response_model=List[CategoryOut])
+async def get_categories(request: Request, response: Response, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user_async)):
+    etag = await versions.current_etag_async(db, current_user, ("categories",))
+    if cached := versions.not_modified(request, response, etag):
+        return cached
+    stmt = select(Category).where(Category.user_id == current_user.id).order_by(Category.name)
+    return category_list.render((await db.execute(stmt)).scalars().all(), response)
+
+
+@router.post("", response_model=CategoryOut, status_code=201)
+async def create_category(category: CategoryCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user_async)):
+    db_category = Category(**category.model_dump(), user_id=current_user.id)
+    db.add(db_category)
+    await db.commit()
+    return db_category
+
+
+@router.put("/{category_id}", response_model=CategoryOut)
+async def update_category(category_id: int, category: CategoryCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user_async)):
+    db_category = await _owned_category(db, category_id, current_user)
+    for key, value in category.model_dump().items():
+        setattr(db_category, key, value)
+    await db.commit()
+    return db_category
+
+
+@router.delete("/{category_id}", status_code=204)
+async def delete_category(category_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user_async)):
+    db_category = await _owned_category(db, category_id, current_user)
+    await db.delete(db_category)
+    await db.commit()
@@ -0,0 +1,119 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+import versions
+from database import get_async_db
+from models import Expense, User
+from schemas import ExpenseChanges, ExpenseCreate, ExpenseOut, ExpenseFilters, ExpenseSummaryOut
+from auth import get_current_user_async
+from routes.expenses import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, DEFAULT_CHANGES_PAGE_SIZE, MAX_CHANGES_PAGE_SIZE, LIST_COLLECTIONS,
+    DEFAULT_SEARCH_PAGE_SIZE, MAX_SEARCH_PAGE_SIZE,
+    _with_persons, _page_statement, _paginate, _summary_statements, _summary_payload,
+    _changes_statement, _changed_rows_statement, _changes_payload, _search_page_statement, _search_page,
+    expense_list,
+)
+
+# Async-mode twin of routes/expenses.py (enabled with ASYNC_DB=true).
+# Endpoints not defined here fall through to the sync router.
+router = APIRouter(prefix="/expenses", tags=["expenses"])
+
+
+async def _load_expense(db: AsyncSession, expense_id: int) -> Expense:
+    stmt = _with_persons(select(Expense)).where(Expense.id == expense_id)
+    return (await db.execute(stmt.execution_options(populate_existing=True))).scalar_one()
+
+
+async def _owned_expense(db: AsyncSession, expense_id: int, current_user: User) -> Expense:
+    db_expense = await db.get(Expense, expense_id)
+    if not db_expense:
+        raise HTTPException(status_code=404, detail="Expense not found")
+    if not current_user.is_admin and db_expense.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return db_expense
+
+
+@router.get("", response_model=List[ExpenseOut])
+async def get_expenses(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    filters: ExpenseFilters = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    etag = await versions.current_etag_async(db, current_user, LIST_COLLECTIONS, all_users=current_user.is_admin)
+    if cached := versions.not_modified(request, response, etag):
+        return cached
+    result = await db.execute(_page_statement(current_user, filters, cursor, limit))
+    return expense_list.render(_paginate(result.scalars().all(), limit, response), response)
+
+
+@router.get("/summary", response_model=ExpenseSummaryOut)
+async def get_summary(
+    filters: ExpenseFilters = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    statements = _summary_statements(current_user, filters)
+    return _summary_payload({key: (await db.execute(stmt)).all() for key, stmt in statements.items()})
+
+
+@router.get("/changes", response_model=ExpenseChanges)
+async def get_changes(
+    since: Optional[str] = None,
+    limit: int = Query(DEFAULT_CHANGES_PAGE_SIZE, ge=1, le=MAX_CHANGES_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    changes = (await db.execute(_changes_statement(current_user, since, limit))).all()
+    upserted_ids = [c.id for c in changes[:limit] if not c.deleted]
+    rows = []
+    if upserted_ids:
+        rows = (await db.execute(_changed_rows_statement(upserted_ids))).unique().scalars().all()
+    return _changes_payload(changes, limit, since, rows)
+
+
+@router.get("/search", response_model=List[ExpenseOut])
+async def search_expenses(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_SEARCH_PAGE_SIZE, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    filters: ExpenseFilters = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    page = _search_page_statement(db.bind.dialect.name, current_user, q, filters, cursor, limit)
+    if page is None:
+        return []
+    stmt, offset = page
+    rows = (await db.execute(stmt)).scalars().all()
+    return expense_list.render(_search_page(rows, offset, limit, response), response)
+
+
+@router.post("", response_model=ExpenseOut, status_code=201)
+async def create_expense(expense: ExpenseCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user_async)):
+    db_expense = Expense(**expense.model_dump(), user_id=current_user.id)
+    db.add(db_expense)
+    await db.commit()
+    return await _load_expense(db, db_expense.id)
+
+
+@router.put("/{expense_id}", response_model=ExpenseOut)
+async def update_expense(expense_id: int, expense: ExpenseCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user_async)):
+    db_expense = await _owned_expense(db, expense_id, current_user)
+    for key, value in expense.model_dump().items():
+        setattr(db_expense, key, value)
+    await db.commit()
+    return await _load_expense(db, expense_id)
+
+
+@router.delete("/{expense_id}", status_code=204)
+async def delete_expense(expense_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user_async)):
+    db_expense = await _owned_expense(db, expense_id, current_user)
+    await db.delete(db_expense)
+    await db.commit()
@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+import versions
+from database import get_async_db
+from models import Person, User
+from schemas import PersonCreate, PersonOut
+from auth import get_current_user_async
+from routes.persons import by_rut_statement, parse_rut, person_list
+
+# Async-mode twin of routes/persons.py (enabled with ASYNC_DB=true)
+router = APIRouter(prefix="/persons", tags=["persons"])
+
+
+async def _owned_person(db: AsyncSession, person_id: int, current_user: User) -> Person:
+    db_person = await db.get(Person, person_id)
+    if not db_person:
+        raise HTTPException(status_code=404, detail="Person not found")
+    if db_person.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return db_person
+
+
+@router.get("", response_model=List[PersonOut])
+async def get_persons(request: Request, response: Response, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user_async)):
+    etag = await versions.current_etag_async(db, current_user, ("persons",))
+    if cached := versions.not_modified(request, response, etag):
+        return cached
+    stmt = select(Person).where(Person.user_id == current_user.id).order_by(Person.name)
+    return person_list.render((await db.execute(stmt)).scalars().all(), response)
+
+
+@router.get("/by-rut/{rut}", response_model=PersonOut)
+async def get_person_by_rut(rut: str, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user_async)):
+    person = (await db.execute(by_rut_statement(current_user.id, parse_rut(rut)))).scalar_one_or_none()
+    if not person:
+        raise HTTPException(status_code=404, detail="Person not found")
+    return person
+
+
+@router.post("", response_model=PersonOut, status_code=201)
+async def create_person(person: PersonCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user_async)):
+    db_person = Person(**person.model_dump(), user_id=current_user.id)
+    db.add(db_person)
+    await db.commit()
+    return db_person
+
+
+@router.put("/{person_id}", response_model=PersonOut)
+async def update_person(person_id: int, person: PersonCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user_async)):
+    db_person = await _owned_person(db, person_id, current_user)
+    for key, value in person.model_dump().items():
+        setattr(db_person, key, value)
+    await db.commit()
+    return db_person
+
+
+@router.delete("/{person_id}", status_code=204)
+async def delete_person(person_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user_async)):
+    db_person = await _owned_person(db, person_id, current_user)
+    await db.delete(db_person)
+    await db.commit()
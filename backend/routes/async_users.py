@@ -0,0 +1,124 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
+
+from database import get_async_db
+from models import User, Person
+from schemas import UserOut, UserMeOut, UserUsageOut, ProfileUpdate
+from auth import require_admin_async, get_current_user_async, principal_cache
+from routes.users import (
+    DEFAULT_DIRECTORY_PAGE_SIZE, MAX_DIRECTORY_PAGE_SIZE, DIRECTORY_SORTS,
+    _directory_statement, _decode_directory_cursor, _directory_page,
+)
+
+# Async-mode twin of routes/users.py (enabled with ASYNC_DB=true).
+# Relationships cannot lazy-load under asyncio, so anything the response
+# model or a cascade touches is loaded explicitly.
+router = APIRouter(prefix="/users", tags=["users"])
+
+
+async def _load_me(db: AsyncSession, user_id: int) -> User:
+    stmt = (
+        select(User)
+        .options(selectinload(User.profile_person))
+        .where(User.id == user_id)
+        .execution_options(populate_existing=True)
+    )
+    return (await db.execute(stmt)).scalar_one()
+
+
+async def _get_user(db: AsyncSession, user_id: int, *options) -> User:
+    user = (await db.execute(select(User).options(*options).where(User.id == user_id))).scalar_one_or_none()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+
+@router.get("/me", response_model=UserMeOut)
+async def get_me(current_user: User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    return await _load_me(db, current_user.id)
+
+
+@router.put("/me/profile", response_model=UserMeOut)
+async def update_profile(
+    data: ProfileUpdate,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if current_user.profile_person_id:
+        person = await db.get(Person, current_user.profile_person_id)
+        if person:
+            person.name = data.name
+            person.type = data.type
+            person.rut = data.rut
+            await db.commit()
+            return await _load_me(db, current_user.id)
+
+    # No profile person yet — create one
+    person = Person(name=data.name, type=data.type, rut=data.rut, user_id=current_user.id)
+    db.add(person)
+    await db.flush()  # get person.id before commit
+    current_user.profile_person_id = person.id
+    await db.commit()
+    principal_cache.invalidate(current_user.username)
+    return await _load_me(db, current_user.id)
+
+
+@router.get("", response_model=List[UserOut])
+async def list_users(db: AsyncSession = Depends(get_async_db), _=Depends(require_admin_async)):
+    return (await db.execute(select(User).order_by(User.created_at))).scalars().all()
+
+
+@router.get("/directory", response_model=List[UserUsageOut])
+async def user_directory(
+    response: Response,
+    sort: str = Query("expense_total", pattern=f"^({'|'.join(DIRECTORY_SORTS)})$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_DIRECTORY_PAGE_SIZE, ge=1, le=MAX_DIRECTORY_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    _=Depends(require_admin_async),
+):
+    offset = _decode_directory_cursor(cursor) if cursor else 0
+    rows = (await db.execute(_directory_statement(sort, order, offset, limit))).all()
+    return _directory_page(rows, offset, limit, response)
+
+
+@router.get("/auth-cache")
+async def auth_cache_stats(_=Depends(require_admin_async)):
+    return principal_cache.stats()
+
+
+@router.patch("/{user_id}/activate", response_model=UserOut)
+async def toggle_active(user_id: int, db: AsyncSession = Depends(get_async_db), _=Depends(require_admin_async)):
+    user = await _get_user(db, user_id)
+    user.is_active = not user.is_active
+    await db.commit()
+    principal_cache.invalidate(user.username)
+    return user
+
+
+@router.patch("/{user_id}/role", response_model=UserOut)
+async def toggle_role(user_id: int, db: AsyncSession = Depends(get_async_db), _=Depends(require_admin_async)):
+    user = await _get_user(db, user_id)
+    user.is_admin = not user.is_admin
+    await db.commit()
+    principal_cache.invalidate(user.username)
+    return user
+
+
+@router.delete("/{user_id}", status_code=204)
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_async_db), _=Depends(require_admin_async)):
+    # delete-orphan cascades need the owned collections in memory
+    user = await _get_user(
+        db, user_id,
+        selectinload(User.expenses), selectinload(User.categories), selectinload(User.persons),
+    )
+    username = user.username
+    await db.delete(user)
+    await db.commit()
+    # After the commit: a request that read the row before it will see the
+    # bumped generation and skip caching its stale copy
+    principal_cache.invalidate(username)
@@ -1,39 +1,58 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from database import get_db
 from models import User
 from schemas import UserCreate, UserOut, Token
-from auth import hash_password, verify_password, create_access_token, get_current_user
+from auth import (
+    hash_password_async, verify_password_async, password_needs_rehash,
+    create_access_token, get_current_user,
+)
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
+# Handlers are async so that waiting on the bcrypt pool does not hold a
+# threadpool thread; the (short) DB work is still pushed to the threadpool.
+
+def _find_user(db: Session, **criteria):
+    return db.query(User).filter_by(**criteria).first()
+
+
+def _save(db: Session, user: User) -> User:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
 @router.post("/register", response_model=UserOut, status_code=201)
-def register(user_in: UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.username == user_in.username).first():
+async def register(user_in: UserCreate, db: Session = Depends(get_db)):
+    if await run_in_threadpool(_find_user, db, username=user_in.username):
         raise HTTPException(status_code=400, detail="Username already taken")
-    if db.query(User).filter(User.email == user_in.email).first():
+    if await run_in_threadpool(_find_user, db, email=user_in.email):
         raise HTTPException(status_code=400, detail="Email already registered")
     user = User(
         username=user_in.username,
         email=user_in.email,
-        hashed_password=hash_password(user_in.password),
+        hashed_password=await hash_password_async(user_in.password),
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    return await run_in_threadpool(_save, db, user)
 
 
 @router.post("/login", response_model=Token)
-def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form.username).first()
-    if not user or not verify_password(form.password, user.hashed_password):
+async def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await run_in_threadpool(_find_user, db, username=form.username)
+    if not user or not await verify_password_async(form.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid username or password")
     if not user.is_active:
         raise HTTPException(status_code=403, detail="Account is deactivated")
+    if password_needs_rehash(user.hashed_password):
+        # BCRYPT_ROUNDS changed since this hash was made; upgrade it transparently
+        user.hashed_password = await hash_password_async(form.password)
+        await run_in_threadpool(_save, db, user)
     token = create_access_token({"sub": user.username})
     return {"access_token": token, "token_type": "bearer"}
 
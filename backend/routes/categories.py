@@ -1,18 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 
+import versions
 from database import get_db
+from fast_json import ListSerializer
 from models import Category, User
 from schemas import CategoryCreate, CategoryOut
 from auth import get_current_user
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
+category_list = ListSerializer(CategoryOut)
+
 
 @router.get("", response_model=List[CategoryOut])
-def get_categories(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return db.query(Category).filter(Category.user_id == current_user.id).order_by(Category.name).all()
+def get_categories(request: Request, response: Response, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    etag = versions.current_etag(db, current_user, ("categories",))
+    if cached := versions.not_modified(request, response, etag):
+        return cached
+    rows = db.query(Category).filter(Category.user_id == current_user.id).order_by(Category.name).all()
+    return category_list.render(rows, response)
 
 
 @router.post("", response_model=CategoryOut, status_code=201)
@@ -1,18 +1,63 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import List
 
+import versions
 from database import get_db
+from fast_json import ListSerializer
 from models import Person, User
 from schemas import PersonCreate, PersonOut
 from auth import get_current_user
+from receipt_parser import canonical_rut
 
 router = APIRouter(prefix="/persons", tags=["persons"])
 
+person_list = ListSerializer(PersonOut)
+
 
 @router.get("", response_model=List[PersonOut])
-def get_persons(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return db.query(Person).filter(Person.user_id == current_user.id).order_by(Person.name).all()
+def get_persons(request: Request, response: Response, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    etag = versions.current_etag(db, current_user, ("persons",))
+    if cached := versions.not_modified(request, response, etag):
+        return cached
+    rows = db.query(Person).filter(Person.user_id == current_user.id).order_by(Person.name).all()
+    return person_list.render(rows, response)
+
+
+def by_rut_statement(user_id: int, canonical: str):
+    """The user's oldest person with this canonical RUT; served by ix_persons_user_rut."""
+    return (
+        select(Person)
+        .where(Person.user_id == user_id, Person.rut_canonical == canonical)
+        .order_by(Person.id)
+        .limit(1)
+    )
+
+
+def by_ruts_statement(user_id: int, canonicals):
+    """The user's persons with any of these canonical RUTs, oldest first; one index probe per RUT."""
+    return (
+        select(Person)
+        .where(Person.user_id == user_id, Person.rut_canonical.in_(canonicals))
+        .order_by(Person.id)
+    )
+
+
+def parse_rut(rut: str) -> str:
+    """``rut`` in canonical form, or a 400 if it is not shaped like a RUT."""
+    canonical = canonical_rut(rut)
+    if canonical is None:
+        raise HTTPException(status_code=400, detail="Invalid RUT")
+    return canonical
+
+
+@router.get("/by-rut/{rut}", response_model=PersonOut)
+def get_person_by_rut(rut: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    person = db.execute(by_rut_statement(current_user.id, parse_rut(rut))).scalar_one_or_none()
+    if not person:
+        raise HTTPException(status_code=404, detail="Person not found")
+    return person
 
 
 @router.post("", response_model=PersonOut, status_code=201)
@@ -1,6 +1,18 @@
-import re
+import asyncio
+import json
+import os
+from typing import List
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
 from auth import get_current_user
+from database import get_db
+from ocr import OCR_PDF_MAX_PAGES, PAGE_BREAK, get_backend, ocr_pool
+from ocr_cache import ocr_cache
+from receipt_parser import canonical_rut, extract_fields
+from routes.persons import by_ruts_statement
+from schemas import PersonOut
 
 router = APIRouter(prefix="/scan", tags=["scan"])
 
@@ -9,94 +21,224 @@ ALLOWED_MIME_TYPES = {
     "image/tiff", "application/pdf",
 }
 MAX_BYTES = 10 * 1024 * 1024  # 10 MB
+MAX_BATCH_FILES = int(os.getenv("SCAN_BATCH_MAX_FILES", "20"))
+SCAN_BATCH_CONCURRENCY = int(os.getenv("SCAN_BATCH_CONCURRENCY", "4"))
 
 
 def _ocr(content: bytes, mime_type: str) -> str:
-    from google.cloud import vision
+    return get_backend().extract_text(content, mime_type)
 
-    client = vision.ImageAnnotatorClient()
-
-    if mime_type == "application/pdf":
-        input_config = vision.InputConfig(content=content, mime_type="application/pdf")
-        feature = vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)
-        file_req = vision.AnnotateFileRequest(
-            input_config=input_config, features=[feature], pages=[1]
-        )
-        resp = client.batch_annotate_files(requests=[file_req])
-        annotation = resp.responses[0].responses[0].full_text_annotation
-    else:
-        image = vision.Image(content=content)
-        resp = client.document_text_detection(image=image)
-        annotation = resp.full_text_annotation
-
-    return annotation.text if annotation else ""
 
+# Thin per-field views over the single-pass engine in receipt_parser.py
 
 def _extract_rut(text: str) -> str | None:
-    # Chilean RUT: XX.XXX.XXX-X or XXXXXXXX-X
-    pattern = r'\b\d{1,2}\.?\d{3}\.?\d{3}-[\dkK]\b'
-    matches = re.findall(pattern, text)
-    return matches[0] if matches else None
+    return extract_fields(text)["rut"]
 
 
 def _extract_amount(text: str) -> float | None:
-    # Chilean pesos (CLP): dot is thousands separator, no decimal places.
-    # Try dotted format first (e.g. "5.500", "180.784"), then plain integer.
-    patterns = [
-        r'(?<!\w)(?:total|monto total|a pagar|importe neto|importe)[\s:$]*([0-9]{1,3}(?:\.[0-9]{3})+)',
-        r'(?<!\w)(?:total|monto total|a pagar|importe neto|importe)[\s:$]*([0-9]{2,})',
-    ]
-    for p in patterns:
-        m = re.search(p, text.lower())
-        if m:
-            raw = m.group(1).replace('.', '')
-            try:
-                return float(raw)
-            except ValueError:
-                continue
-    return None
+    return extract_fields(text)["amount"]
 
 
 def _extract_provider_name(text: str) -> str | None:
-    # 1. Labeled keyword: "Razón Social: ...", "Nombre: ...", "Emisor: ..."
-    m = re.search(r'(?:raz[oó]n social|nombre|emisor)[:\s]+([A-ZÁÉÍÓÚÑ][^\n]{3,60})', text, re.IGNORECASE)
-    if m:
-        name = m.group(1).strip()
-        if name:
-            return name
-    # 2. Fallback: all-caps line ending with a Chilean company legal suffix
-    m = re.search(r'([A-ZÁÉÍÓÚÑ]{2,}[^\n]{0,55}(?:LTDA|S\.A\.|S\.P\.A\.|EIRL|SpA))', text)
-    if m:
-        name = m.group(1).strip()
-        if name:
-            return name
-    return None
+    return extract_fields(text)["provider_name"]
 
 
-@router.post("/receipt")
-async def scan_receipt(
-    file: UploadFile = File(...),
-    current_user=Depends(get_current_user),
-):
-    mime_type = file.content_type or ""
+def _check_mime_type(mime_type: str) -> None:
     if mime_type not in ALLOWED_MIME_TYPES:
         raise HTTPException(
             status_code=415,
             detail=f"Unsupported file type '{mime_type}'. Upload an image or PDF.",
         )
 
-    content = await file.read()
+
+def _check_size(content: bytes) -> None:
     if len(content) > MAX_BYTES:
         raise HTTPException(status_code=413, detail="File too large. Maximum is 10 MB.")
 
+
+def _cache_key(content: bytes, mime_type: str) -> str:
+    return ocr_cache.key(content, mime_type, namespace=get_backend().name)
+
+
+def _fields(raw_text: str) -> dict:
+    return {**extract_fields(raw_text), "raw_text": raw_text}
+
+
+async def _run_ocr(fn, *args):
     try:
-        raw_text = _ocr(content, mime_type)
+        return await ocr_pool.run(fn, *args)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"OCR service error: {str(e)}")
 
-    return {
-        "amount": _extract_amount(raw_text),
-        "rut": _extract_rut(raw_text),
-        "provider_name": _extract_provider_name(raw_text),
-        "raw_text": raw_text,
-    }
+
+async def _ocr_document(content: bytes, mime_type: str) -> str:
+    """OCR a whole upload; PDF pages are merged with PAGE_BREAK between them.
+
+    The first call returns up to ``pdf_pages_per_call`` pages plus the page
+    count; the remaining pages (up to OCR_PDF_MAX_PAGES) then go out as
+    concurrent calls, so any PDF costs at most two OCR round trips.
+    """
+    backend = get_backend()
+    per_call = backend.pdf_pages_per_call
+    if mime_type != "application/pdf" or per_call <= 0:
+        return await _run_ocr(_ocr, content, mime_type)
+
+    texts, total = await _run_ocr(backend.extract_pdf_pages, content, [])
+    remaining = list(range(len(texts) + 1, min(total, OCR_PDF_MAX_PAGES) + 1))
+    batches = [remaining[i:i + per_call] for i in range(0, len(remaining), per_call)]
+    for batch_texts, _ in await asyncio.gather(
+        *(_run_ocr(backend.extract_pdf_pages, content, batch) for batch in batches)
+    ):
+        texts += batch_texts
+    return PAGE_BREAK.join(texts[:OCR_PDF_MAX_PAGES])
+
+
+def _match_persons(db: Session, user_id: int, ruts) -> dict:
+    """Extracted RUT -> the user's oldest person with it, in one query on (user_id, rut_canonical)."""
+    # Extracted RUTs passed the verifier check, so they always canonicalize
+    canonicals = {rut: canonical_rut(rut) for rut in ruts if rut is not None}
+    if not canonicals:
+        return {}
+    by_canonical = {}
+    for person in db.execute(by_ruts_statement(user_id, set(canonicals.values()))).scalars():
+        by_canonical.setdefault(person.rut_canonical, PersonOut.model_validate(person).model_dump())
+    return {rut: by_canonical[c] for rut, c in canonicals.items() if c in by_canonical}
+
+
+@router.post("/receipt")
+async def scan_receipt(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """OCR one receipt; ``person`` is the saved provider matching its RUT, if any."""
+    mime_type = file.content_type or ""
+    _check_mime_type(mime_type)
+    content = await file.read()
+    _check_size(content)
+
+    cache_key = _cache_key(content, mime_type)
+    raw_text = await ocr_cache.aget(cache_key)
+    if raw_text is None:
+        raw_text = await _ocr_document(content, mime_type)
+        await ocr_cache.aput(cache_key, raw_text)
+
+    fields = _fields(raw_text)
+    matched = await run_in_threadpool(_match_persons, db, current_user.id, [fields["rut"]])
+    fields["person"] = matched.get(fields["rut"])
+    return fields
+
+
+# ── Batch scanning ────────────────────────────────────
+
+def _batch_result(item: dict, raw_text: str | None = None, error: HTTPException | None = None) -> dict:
+    result = {"index": item["index"], "filename": item["filename"]}
+    if error is not None:
+        return {**result, "status": error.status_code, "detail": error.detail}
+    return {**result, "status": 200, **_fields(raw_text)}
+
+
+def _attach_persons(db: Session, user_id: int, results: list) -> list:
+    """Set ``person`` on every successful result, as the single-file response does."""
+    scanned = [result for result in results if result["status"] == 200]
+    matched = _match_persons(db, user_id, [result["rut"] for result in scanned])
+    for result in scanned:
+        result["person"] = matched.get(result["rut"])
+    return results
+
+
+def _ocr_groups(pending: list) -> list:
+    """Split uncached items into units of OCR work.
+
+    Backends with a native batch call (``batch_size > 1``) get images in
+    groups of up to ``batch_size``; everything else is scanned one by one.
+    """
+    batch_size = get_backend().batch_size
+    if batch_size <= 1:
+        return [[item] for item in pending]
+    images = [item for item in pending if item["mime_type"] != "application/pdf"]
+    groups = [[item] for item in pending if item["mime_type"] == "application/pdf"]
+    groups += [images[i:i + batch_size] for i in range(0, len(images), batch_size)]
+    return groups
+
+
+async def _scan_group(group: list) -> list:
+    try:
+        if get_backend().batch_size <= 1 or group[0]["mime_type"] == "application/pdf":
+            texts = [await _ocr_document(group[0]["content"], group[0]["mime_type"])]
+        else:
+            texts = await _run_ocr(
+                get_backend().extract_batch,
+                [(item["content"], item["mime_type"]) for item in group],
+            )
+    except HTTPException as e:
+        return [_batch_result(item, error=e) for item in group]
+
+    results = []
+    for item, text in zip(group, texts):
+        if isinstance(text, Exception):
+            results.append(_batch_result(item, error=HTTPException(502, f"OCR service error: {text}")))
+        else:
+            await ocr_cache.aput(item["cache_key"], text)
+            results.append(_batch_result(item, raw_text=text))
+    return results
+
+
+@router.post("/receipts")
+async def scan_receipts(
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Scan many receipts at once, streaming one NDJSON line per file as it finishes.
+
+    Each line carries the single-file response fields, ``person`` included,
+    plus ``index``, ``filename`` and ``status``; failed files have
+    ``detail`` instead. Persons are matched with one query per chunk of
+    finished results.
+    """
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_FILES} files per batch.")
+
+    # Read everything before streaming: uploads are closed once the handler returns
+    ready, pending = [], []
+    for index, file in enumerate(files):
+        item = {"index": index, "filename": file.filename, "mime_type": file.content_type or ""}
+        try:
+            _check_mime_type(item["mime_type"])
+            item["content"] = await file.read()
+            _check_size(item["content"])
+        except HTTPException as e:
+            ready.append(_batch_result(item, error=e))
+            continue
+        item["cache_key"] = _cache_key(item["content"], item["mime_type"])
+        raw_text = await ocr_cache.aget(item["cache_key"])
+        if raw_text is not None:
+            ready.append(_batch_result(item, raw_text=raw_text))
+        else:
+            pending.append(item)
+
+    fan_out = asyncio.Semaphore(SCAN_BATCH_CONCURRENCY)
+
+    async def limited(group):
+        async with fan_out:
+            return await _scan_group(group)
+
+    def with_persons(results):
+        return run_in_threadpool(_attach_persons, db, current_user.id, results)
+
+    async def stream():
+        for result in await with_persons(ready):
+            yield json.dumps(result) + "\n"
+        tasks = [asyncio.create_task(limited(group)) for group in _ocr_groups(pending)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                for result in await with_persons(await finished):
+                    yield json.dumps(result) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -1,14 +1,96 @@
-from fastapi import APIRouter, Depends, HTTPException
+import base64
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import case, func, select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from database import get_db
-from models import User, Person
-from schemas import UserOut, UserMeOut, ProfileUpdate
-from auth import require_admin, get_current_user
+from models import Category, Expense, ExpenseTombstone, User, Person
+from schemas import UserOut, UserMeOut, UserUsageOut, ProfileUpdate
+from auth import require_admin, get_current_user, principal_cache
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+DEFAULT_DIRECTORY_PAGE_SIZE = 50
+MAX_DIRECTORY_PAGE_SIZE = 200
+DIRECTORY_SORTS = (
+    "created_at", "username", "expense_count", "expense_total", "last_activity", "person_count", "category_count",
+)
+
+
+def _per_user(model, **aggregates):
+    return select(model.user_id, *(agg.label(name) for name, agg in aggregates.items())).group_by(model.user_id).subquery()
+
+
+def _directory_statement(sort: str, order: str, offset: int, limit: int):
+    # One grouped subquery per table, outer-joined to users: joining the
+    # tables directly would multiply expenses by persons by categories.
+    expenses = _per_user(
+        Expense,
+        expense_count=func.count(Expense.id),
+        expense_total=func.sum(Expense.amount),
+        last_write=func.max(Expense.updated_at),
+    )
+    deletions = _per_user(ExpenseTombstone, last_delete=func.max(ExpenseTombstone.deleted_at))
+    persons = _per_user(Person, person_count=func.count(Person.id))
+    categories = _per_user(Category, category_count=func.count(Category.id))
+    # Activity is the latest expense write (create, edit, or an edit of a
+    # person it shows) or deletion. Rows from before change tracking count
+    # as written on their own date (migration 9).
+    last_write, last_delete = expenses.c.last_write, deletions.c.last_delete
+    last_activity = case(
+        (last_delete.is_(None), last_write),
+        (last_write.is_(None) | (last_delete > last_write), last_delete),
+        else_=last_write,
+    )
+    columns = {
+        "created_at": User.created_at,
+        "username": User.username,
+        "expense_count": func.coalesce(expenses.c.expense_count, 0),
+        "expense_total": func.coalesce(expenses.c.expense_total, 0.0),
+        "last_activity": last_activity,
+        "person_count": func.coalesce(persons.c.person_count, 0),
+        "category_count": func.coalesce(categories.c.category_count, 0),
+    }
+    sort_column = columns[sort].desc() if order == "desc" else columns[sort].asc()
+    tiebreak = User.id.desc() if order == "desc" else User.id.asc()
+    return (
+        select(
+            User.id, User.username, User.email, User.is_admin, User.is_active,
+            *(column.label(name) for name, column in columns.items() if name not in ("created_at", "username")),
+            User.created_at,
+        )
+        .outerjoin(expenses, expenses.c.user_id == User.id)
+        .outerjoin(deletions, deletions.c.user_id == User.id)
+        .outerjoin(persons, persons.c.user_id == User.id)
+        .outerjoin(categories, categories.c.user_id == User.id)
+        .order_by(sort_column.nulls_last(), tiebreak)
+        .offset(offset)
+        .limit(limit + 1)
+    )
+
+
+# The aggregates move between requests, so a keyset cursor over them would
+# not be stable either; the directory cursor is a plain offset.
+def _encode_directory_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+
+def _decode_directory_cursor(cursor: str) -> int:
+    try:
+        offset = int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return offset
+
+
+def _directory_page(rows: list, offset: int, limit: int, response: Response) -> list:
+    if len(rows) > limit:
+        response.headers["X-Next-Cursor"] = _encode_directory_cursor(offset + limit)
+    return rows[:limit]
+
 
 @router.get("/me", response_model=UserMeOut)
 def get_me(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -37,6 +119,7 @@ def update_profile(
     db.flush()  # get person.id before commit
     current_user.profile_person_id = person.id
     db.commit()
+    principal_cache.invalidate(current_user.username)
     db.refresh(current_user)
     return current_user
 
@@ -46,6 +129,27 @@ def list_users(db: Session = Depends(get_db), _=Depends(require_admin)):
     return db.query(User).order_by(User.created_at).all()
 
 
+@router.get("/directory", response_model=List[UserUsageOut])
+def user_directory(
+    response: Response,
+    sort: str = Query("expense_total", pattern=f"^({'|'.join(DIRECTORY_SORTS)})$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_DIRECTORY_PAGE_SIZE, ge=1, le=MAX_DIRECTORY_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    _=Depends(require_admin),
+):
+    """Users with their usage totals, heaviest first by default."""
+    offset = _decode_directory_cursor(cursor) if cursor else 0
+    rows = db.execute(_directory_statement(sort, order, offset, limit)).all()
+    return _directory_page(rows, offset, limit, response)
+
+
+@router.get("/auth-cache")
+def auth_cache_stats(_=Depends(require_admin)):
+    return principal_cache.stats()
+
+
 @router.patch("/{user_id}/activate", response_model=UserOut)
 def toggle_active(user_id: int, db: Session = Depends(get_db), _=Depends(require_admin)):
     user = db.query(User).filter(User.id == user_id).first()
@@ -53,6 +157,7 @@ def toggle_active(user_id: int, db: Session = Depends(get_db), _=Depends(require
         raise HTTPException(status_code=404, detail="User not found")
     user.is_active = not user.is_active
     db.commit()
+    principal_cache.invalidate(user.username)
     db.refresh(user)
     return user
 
@@ -64,6 +169,7 @@ def toggle_role(user_id: int, db: Session = Depends(get_db), _=Depends(require_a
         raise HTTPException(status_code=404, detail="User not found")
     user.is_admin = not user.is_admin
     db.commit()
+    principal_cache.invalidate(user.username)
     db.refresh(user)
     return user
 
@@ -73,5 +179,9 @@ def delete_user(user_id: int, db: Session = Depends(get_db), _=Depends(require_a
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    username = user.username
     db.delete(user)
     db.commit()
+    # After the commit: a request that read the row before it will see the
+    # bumped generation and skip caching its stale copy
+    principal_cache.invalidate(username)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Literal, Optional
 import datetime
 
 
@@ -48,6 +48,15 @@ class UserOut(BaseModel):
         from_attributes = True
 
 
+class UserUsageOut(UserOut):
+    """A row of the admin user directory (GET /users/directory)."""
+    expense_count: int
+    expense_total: float
+    last_activity: Optional[datetime.datetime] = None  # latest expense write or deletion
+    person_count: int
+    category_count: int
+
+
 class UserMeOut(BaseModel):
     id: int
     username: str
@@ -89,11 +98,99 @@ class ExpenseOut(BaseModel):
     recipient_id: int
     provider: PersonOut
     recipient: PersonOut
+    updated_at: Optional[datetime.datetime] = None
 
     class Config:
         from_attributes = True
 
 
+class ExpenseChanges(BaseModel):
+    """One page of GET /expenses/changes. Apply ``deleted`` before ``upserted``."""
+    upserted: List[ExpenseOut]
+    deleted: List[int]
+    cursor: str
+    has_more: bool
+
+
+class ExpenseFilters(BaseModel):
+    date_from: Optional[datetime.date] = None
+    date_to: Optional[datetime.date] = None
+    category: Optional[str] = None
+    provider_id: Optional[int] = None
+    recipient_id: Optional[int] = None
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+
+
+class SummaryRow(BaseModel):
+    key: str
+    total: float
+    count: int
+
+
+class PersonSummaryRow(BaseModel):
+    person_id: int
+    name: str
+    total: float
+    count: int
+
+
+class ExpenseSummaryOut(BaseModel):
+    total: float
+    count: int
+    largest: float
+    by_month: List[SummaryRow]
+    by_category: List[SummaryRow]
+    by_provider: List[PersonSummaryRow]
+    by_recipient: List[PersonSummaryRow]
+
+
+class ImportRowError(BaseModel):
+    row: int
+    detail: str
+
+
+class ImportResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[ImportRowError]
+
+
+class ExpenseBatchOp(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[int] = None
+    data: Optional[ExpenseCreate] = None
+
+    @model_validator(mode="after")
+    def check_fields(self):
+        if self.op != "create" and self.id is None:
+            raise ValueError(f"'{self.op}' needs an id")
+        if self.op != "delete" and self.data is None:
+            raise ValueError(f"'{self.op}' needs data")
+        return self
+
+
+class ExpenseBatch(BaseModel):
+    operations: List[ExpenseBatchOp] = Field(min_length=1, max_length=500)
+    # All-or-nothing by default; False applies the operations that pass
+    atomic: bool = True
+
+
+class ExpenseBatchResult(BaseModel):
+    index: int
+    op: str
+    status: int
+    id: Optional[int] = None
+    expense: Optional[ExpenseOut] = None
+    detail: Optional[str] = None
+
+
+class ExpenseBatchOut(BaseModel):
+    applied: int
+    failed: int
+    results: List[ExpenseBatchResult]
+
+
 # ── Categories ─────────────────────────────────────────
 class CategoryCreate(BaseModel):
     name: str
@@ -0,0 +1,214 @@
+"""Full-text search over expenses (GET /expenses/search).
+
+Each expense is indexed with its title, note and the names of its provider
+and recipient, in an ``expense_search`` table that only exists on the
+dialects with a native index:
+
+- SQLite: an FTS5 virtual table keyed by rowid = expense id, ranked by bm25.
+- Postgres: one weighted tsvector per expense under a GIN index, ranked by
+  ts_rank.
+
+Both ignore case and accents ("cafe" finds "Café"): FTS5 through its
+remove_diacritics tokenizer, Postgres by passing documents and queries
+through the ``unaccent`` extension before the 'simple' configuration.
+
+The table is created with the schema (an after_create hook on the metadata,
+and migration 6 for existing databases). An after_flush hook on every
+Session reindexes the expenses a flush wrote, and those of renamed persons,
+in the same transaction. Core-level bulk writes bypass the ORM and must
+call reindex themselves.
+
+Other dialects have no index; search falls back to a LIKE scan, which
+folds case but not accents.
+"""
+import re
+
+from sqlalchemy import DDL, Integer, column, delete, event, func, insert, inspect, literal_column, or_, select, table
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session, aliased
+
+from database import Base
+from models import Expense, Person, User
+
+SEARCH_TABLE = "expense_search"
+MAX_TERMS = 8
+
+_DDL = {
+    "sqlite": [
+        # remove_diacritics: "cafe" finds "Café"
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        "title, note, provider, recipient, user_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')",
+    ],
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS unaccent",
+        f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+        "expense_id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, document TSVECTOR NOT NULL)",
+        f"CREATE INDEX IF NOT EXISTS ix_expense_search_document ON {SEARCH_TABLE} USING GIN (document)",
+    ],
+}
+
+_fts = table(
+    SEARCH_TABLE,
+    column("rowid", Integer), column("title"), column("note"), column("provider"), column("recipient"),
+    column("user_id", Integer),
+)
+_pg = table(SEARCH_TABLE, column("expense_id", Integer), column("user_id", Integer), column("document"))
+_PG_CONFIG = literal_column("'simple'::regconfig")
+
+# bm25 column weights: title, note, provider, recipient, user_id
+_BM25_WEIGHTS = (10.0, 1.0, 4.0, 4.0, 0.0)
+
+_INDEXED_EXPENSE_FIELDS = ("title", "note", "provider_id", "recipient_id")
+
+
+def supported(dialect_name: str) -> bool:
+    return dialect_name in _DDL
+
+
+def create(connection):
+    for statement in _DDL.get(connection.dialect.name, []):
+        connection.execute(DDL(statement))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_with_schema(target, connection, **kw):
+    create(connection)
+
+
+@event.listens_for(Base.metadata, "before_drop")
+def _drop_with_schema(target, connection, **kw):
+    if supported(connection.dialect.name):
+        connection.execute(DDL(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+
+
+# ── Indexing ──────────────────────────────────────────
+
+def _documents(*conditions):
+    provider = aliased(Person)
+    recipient = aliased(Person)
+    return (
+        select(
+            Expense.id, Expense.user_id, Expense.title, func.coalesce(Expense.note, "").label("note"),
+            provider.name.label("provider"), recipient.name.label("recipient"),
+        )
+        .join(provider, Expense.provider_id == provider.id)
+        .join(recipient, Expense.recipient_id == recipient.id)
+        .where(*conditions)
+    )
+
+
+def _tsvector(text, weight: str):
+    # setweight() takes a "char"; an untyped literal resolves to it
+    return func.setweight(func.to_tsvector(_PG_CONFIG, func.unaccent(text)), literal_column(f"'{weight}'"))
+
+
+def _index_table(dialect_name: str):
+    """The search table and its expense id column."""
+    return (_fts, _fts.c.rowid) if dialect_name == "sqlite" else (_pg, _pg.c.expense_id)
+
+
+def reindex(connection, *conditions):
+    """(Re)build the index entries of the expenses matching ``conditions`` (all when none).
+
+    One statement: an insert that replaces any existing entry for the id.
+    """
+    dialect = connection.dialect.name
+    if not supported(dialect):
+        return
+    docs = _documents(*conditions).subquery()
+    if dialect == "sqlite":
+        connection.execute(insert(_fts).prefix_with("OR REPLACE").from_select(
+            ["rowid", "user_id", "title", "note", "provider", "recipient"],
+            select(docs.c.id, docs.c.user_id, docs.c.title, docs.c.note, docs.c.provider, docs.c.recipient),
+        ))
+        return
+    document = (
+        _tsvector(docs.c.title, "A")
+        .op("||")(_tsvector(docs.c.provider + " " + docs.c.recipient, "B"))
+        .op("||")(_tsvector(docs.c.note, "C"))
+    )
+    stmt = postgresql.insert(_pg).from_select(
+        ["expense_id", "user_id", "document"], select(docs.c.id, docs.c.user_id, document),
+    )
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=[_pg.c.expense_id],
+        set_={"user_id": stmt.excluded.user_id, "document": stmt.excluded.document},
+    ))
+
+
+def _changed(obj, fields) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_search_writes(session, flush_context):
+    # after_flush: new expenses have their ids, and new/dirty/deleted and
+    # attribute history still describe what this flush wrote
+    expense_ids, person_ids, removed, deleted_users = set(), set(), set(), set()
+    for obj in session.new:
+        if isinstance(obj, Expense):
+            expense_ids.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Expense) and _changed(obj, _INDEXED_EXPENSE_FIELDS):
+            expense_ids.add(obj.id)
+        elif isinstance(obj, Person) and _changed(obj, ("name",)):
+            person_ids.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Expense):
+            removed.add(obj.id)
+        elif isinstance(obj, User):
+            deleted_users.add(obj.id)
+    if not (expense_ids or person_ids or removed or deleted_users):
+        return
+
+    connection = session.connection()
+    if not supported(connection.dialect.name):
+        return
+    target, key = _index_table(connection.dialect.name)
+    if removed:
+        connection.execute(delete(target).where(key.in_(removed)))
+    if deleted_users:
+        # Cascaded expense deletes may not all be listed; drop by owner
+        connection.execute(delete(target).where(target.c.user_id.in_(deleted_users)))
+    if expense_ids:
+        reindex(connection, Expense.id.in_(expense_ids))
+    if person_ids:
+        reindex(connection, or_(Expense.provider_id.in_(person_ids), Expense.recipient_id.in_(person_ids)))
+
+
+# ── Querying ──────────────────────────────────────────
+
+def terms(q: str) -> list[str]:
+    """The words of a query, lowercased; punctuation and operators are dropped."""
+    return re.findall(r"\w+", q.lower())[:MAX_TERMS]
+
+
+def search_statement(dialect_name: str, words: list[str], conditions: list):
+    """Expenses matching every word as a prefix, best match first."""
+    stmt = select(Expense).where(*conditions)
+    if dialect_name == "sqlite":
+        fts = literal_column(SEARCH_TABLE)
+        rank = func.bm25(fts, *_BM25_WEIGHTS)
+        return (
+            stmt.join(_fts, _fts.c.rowid == Expense.id)
+            .where(fts.op("MATCH")(" ".join(f'"{word}"*' for word in words)))
+            .order_by(rank, Expense.id.desc())
+        )
+    if dialect_name == "postgresql":
+        query = func.to_tsquery(_PG_CONFIG, func.unaccent(" & ".join(f"{word}:*" for word in words)))
+        return (
+            stmt.join(_pg, _pg.c.expense_id == Expense.id)
+            .where(_pg.c.document.op("@@")(query))
+            .order_by(func.ts_rank(_pg.c.document, query).desc(), Expense.id.desc())
+        )
+    # No index on this dialect: every word must appear somewhere, newest first
+    provider = aliased(Person)
+    recipient = aliased(Person)
+    fields = (Expense.title, Expense.note, provider.name, recipient.name)
+    return (
+        stmt.join(provider, Expense.provider_id == provider.id)
+        .join(recipient, Expense.recipient_id == recipient.id)
+        .where(*(or_(*(field.ilike(f"%{word}%") for field in fields)) for word in words))
+        .order_by(Expense.date.desc(), Expense.id.desc())
+    )
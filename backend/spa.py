@@ -0,0 +1,188 @@
+"""
+Usage:
+    python spa.py static     # write .gz/.br next to each compressible file
+
+In-memory serving of the built React SPA (backend/static).
+
+The static tree is read once at startup: every file is kept in memory with
+its gzip and, when the optional ``brotli`` package is installed, brotli
+variants. The image build runs this module on the tree, so the variants are
+compressed at maximum effort once and merely read at boot; without them,
+boot falls back to cheap compression levels. A request then costs a dict
+lookup; the encoding is picked from Accept-Encoding. HEAD is answered with
+the headers of the matching GET.
+
+- ``assets/*`` are Vite's content-hashed bundles: cached for a year as
+  immutable. Unknown asset paths are a 404 rather than the SPA shell.
+- Everything else, index.html included, is revalidated on each load via
+  its ETag and answered with a 304 when unchanged.
+- Any other path falls back to index.html for client-side routing.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import sys
+from dataclasses import dataclass, field
+
+from fastapi import FastAPI, HTTPException, Request, Response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+ASSET_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+# Precompressing binary formats (images, fonts) gains nothing
+_COMPRESSIBLE = ("text/", "application/javascript", "application/json", "application/xml", "image/svg+xml")
+# Keep a variant only if it saves at least this fraction of the bytes
+_MIN_SAVING = 0.1
+# Sibling files written by precompress(), by content-coding
+_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+# Levels for precompress() (once per build) and for boot without its output
+_BUILD_LEVELS = {"gzip": 9, "br": 11}
+_BOOT_LEVELS = {"gzip": 6, "br": 5}
+
+
+@dataclass
+class StaticFile:
+    content_type: str
+    etag: str
+    cache_control: str
+    bodies: dict = field(default_factory=dict)  # content-coding ("identity", "br", "gzip") -> bytes
+
+
+def _compressible(content_type: str) -> bool:
+    return content_type.startswith(_COMPRESSIBLE)
+
+
+def _compress(body: bytes, levels: dict) -> dict:
+    variants = {"gzip": gzip.compress(body, compresslevel=levels["gzip"], mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=levels["br"])
+    return variants
+
+
+def _read(path: str) -> bytes | None:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _load(path: str, cache_control: str) -> StaticFile:
+    body = _read(path)
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    # Weak: one tag covers every content-coding of the same file
+    etag = f'W/"{hashlib.sha256(body).hexdigest()[:20]}"'
+    entry = StaticFile(content_type, etag, cache_control, {"identity": body})
+    if _compressible(content_type):
+        variants = {coding: _read(path + suffix) for coding, suffix in _SUFFIXES.items()}
+        variants = {coding: data for coding, data in variants.items() if data is not None}
+        if not variants:
+            variants = _compress(body, _BOOT_LEVELS)
+        for coding, data in variants.items():
+            if len(data) <= len(body) * (1 - _MIN_SAVING):
+                entry.bodies[coding] = data
+    return entry
+
+
+def _is_variant(path: str) -> bool:
+    """A precompressed sibling of another file in the tree."""
+    return any(path.endswith(suffix) and os.path.isfile(path[:-len(suffix)]) for suffix in _SUFFIXES.values())
+
+
+def build_index(root: str) -> dict[str, StaticFile]:
+    """Map each file's URL path under ``root`` ("assets/app-1a2b.js") to its entry."""
+    index = {}
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            if _is_variant(path):
+                continue
+            url_path = os.path.relpath(path, root).replace(os.sep, "/")
+            cache = ASSET_CACHE if url_path.startswith("assets/") else REVALIDATE_CACHE
+            index[url_path] = _load(path, cache)
+    return index
+
+
+def precompress(root: str) -> int:
+    """Write maximum-effort .gz/.br siblings for the compressible files under ``root``; return how many."""
+    written = 0
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            content_type = mimetypes.guess_type(path)[0] or ""
+            if _is_variant(path) or not _compressible(content_type):
+                continue
+            for coding, data in _compress(_read(path), _BUILD_LEVELS).items():
+                with open(path + _SUFFIXES[coding], "wb") as f:
+                    f.write(data)
+                written += 1
+    return written
+
+
+def accepted_codings(accept_encoding: str) -> set[str]:
+    """Content-codings the client accepts; ``q=0`` excludes one."""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        q = params.strip().removeprefix("q=")
+        try:
+            if coding and (not params or float(q) > 0):
+                accepted.add(coding)
+        except ValueError:
+            continue
+    return accepted
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def respond(entry: StaticFile, request: Request) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": entry.cache_control}
+    if len(entry.bodies) > 1:
+        headers["Vary"] = "Accept-Encoding"
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+
+    accepted = accepted_codings(request.headers.get("accept-encoding", ""))
+    coding = next((c for c in ("br", "gzip") if c in entry.bodies and c in accepted), "identity")
+    if coding != "identity":
+        headers["Content-Encoding"] = coding
+    body = entry.bodies[coding]
+    if request.method == "HEAD":
+        headers["Content-Length"] = str(len(body))
+        body = b""
+    return Response(body, media_type=entry.content_type, headers=headers)
+
+
+def mount(app: FastAPI, root: str) -> dict[str, StaticFile]:
+    """Index ``root`` and register the catch-all route that serves it."""
+    index = build_index(root)
+    shell = index.get("index.html")
+
+    @app.api_route("/{full_path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+    async def serve_spa(full_path: str, request: Request):
+        entry = index.get(full_path)
+        if entry is None:
+            if full_path.startswith("assets/") or shell is None:
+                raise HTTPException(status_code=404, detail="Not Found")
+            entry = shell
+        return respond(entry, request)
+
+    return index
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python spa.py <static dir>")
+        sys.exit(1)
+    print(f"✓ wrote {precompress(sys.argv[1])} precompressed files")
@@ -11,6 +11,7 @@ from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+import main
 from database import Base, get_db
 from main import app
 from models import User
@@ -39,13 +40,21 @@ def setup_db():
         hashed_password=hash_password("testpass"),
         is_active=True,
     )
-    db.add(user)
+    admin = User(
+        username="testadmin",
+        email="admin@test.com",
+        hashed_password=hash_password("adminpass"),
+        is_active=True,
+        is_admin=True,
+    )
+    db.add_all([user, admin])
     db.commit()
     db.close()
     yield
     Base.metadata.drop_all(bind=test_engine)
-    if os.path.exists("test_xpends.db"):
-        os.remove("test_xpends.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists("test_xpends.db" + suffix):
+            os.remove("test_xpends.db" + suffix)
 
 
 @pytest.fixture(scope="session")
@@ -65,3 +74,30 @@ def auth_headers(client):
     assert res.status_code == 200, f"Login failed: {res.text}"
     token = res.json()["access_token"]
     return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    res = client.post(
+        "/auth/login",
+        data={"username": "testadmin", "password": "adminpass"},
+    )
+    assert res.status_code == 200, f"Login failed: {res.text}"
+    token = res.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def query_budget(monkeypatch):
+    """Return a checker asserting a response issued at most N SQL statements."""
+    monkeypatch.setattr(main, "DEBUG", True)
+
+    def check(response, max_queries: int):
+        count = int(response.headers["X-Query-Count"])
+        assert count <= max_queries, (
+            f"{response.request.method} {response.request.url.path} issued "
+            f"{count} queries (budget {max_queries})"
+        )
+        return count
+
+    return check
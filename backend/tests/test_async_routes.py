@@ -0,0 +1,130 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import get_async_db, async_database_url
+from routes.async_expenses import router as async_expenses_router
+from routes.async_users import router as async_users_router
+from routes.async_categories import router as async_categories_router
+from routes.async_persons import router as async_persons_router
+from tests.conftest import TEST_DB_URL
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# An app with only the async routers, on aiosqlite against the test database.
+# Tokens come from the regular (sync) /auth/login on the main test client.
+# ──────────────────────────────────────────────────────────────────────────────
+
+@pytest.fixture(scope="module")
+def async_client(client):
+    engine = create_async_engine(async_database_url(TEST_DB_URL))
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    for router in (async_users_router, async_expenses_router, async_categories_router, async_persons_router):
+        app.include_router(router)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    with TestClient(app) as c:
+        yield c
+
+
+def test_async_database_url():
+    assert async_database_url("sqlite:///./x.db") == "sqlite+aiosqlite:///./x.db"
+    assert async_database_url("postgresql+psycopg2://u:p@/db?host=/cloudsql/i").startswith("postgresql+asyncpg://u:p@/db")
+
+
+def test_requires_auth(async_client):
+    assert async_client.get("/expenses").status_code == 401
+
+
+def test_expense_crud_roundtrip(async_client, auth_headers):
+    provider = async_client.post(
+        "/persons", json={"name": "Async Store", "type": "Company", "rut": "11.111.111-1"}, headers=auth_headers,
+    ).json()
+    category = async_client.post("/categories", json={"name": "Async"}, headers=auth_headers)
+    assert category.status_code == 201
+    assert async_client.get("/persons/by-rut/11111111-1", headers=auth_headers).json()["id"] == provider["id"]
+
+    payload = {
+        "title": "Async lunch",
+        "amount": 4500.0,
+        "category": "Async",
+        "date": "2022-06-01",
+        "provider_id": provider["id"],
+        "recipient_id": provider["id"],
+    }
+    created = async_client.post("/expenses", json=payload, headers=auth_headers)
+    assert created.status_code == 201
+    assert created.json()["provider"]["name"] == "Async Store"
+
+    updated = async_client.put(
+        f"/expenses/{created.json()['id']}", json={**payload, "amount": 5000.0}, headers=auth_headers,
+    )
+    assert updated.json()["amount"] == 5000.0
+
+    listed = async_client.get("/expenses", params={"category": "Async"}, headers=auth_headers).json()
+    assert [e["id"] for e in listed] == [created.json()["id"]]
+    found = async_client.get("/expenses/search", params={"q": "async lunch"}, headers=auth_headers).json()
+    assert [e["id"] for e in found] == [created.json()["id"]]
+
+    summary = async_client.get("/expenses/summary", params={"category": "Async"}, headers=auth_headers).json()
+    assert summary["total"] == 5000.0 and summary["by_month"][0]["key"] == "2022-06"
+
+    assert async_client.delete(f"/expenses/{created.json()['id']}", headers=auth_headers).status_code == 204
+    assert async_client.delete(f"/categories/{category.json()['id']}", headers=auth_headers).status_code == 204
+
+
+def test_me_and_profile(async_client, auth_headers):
+    res = async_client.put(
+        "/users/me/profile", json={"name": "Test User", "type": "Individual", "rut": "9.876.543-3"}, headers=auth_headers,
+    )
+    assert res.status_code == 200
+    assert res.json()["profile_person"]["name"] == "Test User"
+    assert async_client.get("/users/me", headers=auth_headers).json()["profile_person_id"] == res.json()["profile_person_id"]
+
+
+def test_admin_user_management(async_client, client, admin_headers, auth_headers):
+    assert async_client.get("/users", headers=auth_headers).status_code == 403
+    client.post("/auth/register", json={"username": "asyncdoomed", "email": "ad@test.com", "password": "pw"})
+    users = async_client.get("/users", headers=admin_headers).json()
+    doomed = next(u for u in users if u["username"] == "asyncdoomed")
+
+    assert async_client.patch(f"/users/{doomed['id']}/role", headers=admin_headers).json()["is_admin"] is True
+    assert async_client.patch(f"/users/{doomed['id']}/activate", headers=admin_headers).json()["is_active"] is False
+    assert async_client.delete(f"/users/{doomed['id']}", headers=admin_headers).status_code == 204
+    assert async_client.delete(f"/users/{doomed['id']}", headers=admin_headers).status_code == 404
+
+
+def test_user_directory(async_client, admin_headers):
+    res = async_client.get("/users/directory", params={"sort": "username", "order": "asc", "limit": 1}, headers=admin_headers)
+    assert res.status_code == 200 and len(res.json()) == 1
+    assert {"expense_count", "expense_total", "last_activity", "person_count", "category_count"} <= res.json()[0].keys()
+    assert "X-Next-Cursor" in res.headers
+
+
+def test_changes_feed(async_client, auth_headers):
+    start = async_client.get("/expenses/changes", params={"limit": 5000}, headers=auth_headers).json()
+    provider = async_client.post(
+        "/persons", json={"name": "Async Delta", "type": "Company", "rut": "11.111.111-1"}, headers=auth_headers,
+    ).json()
+    created = async_client.post("/expenses", json={
+        "title": "Async delta", "amount": 1.0, "category": "Other", "date": "2016-01-01",
+        "provider_id": provider["id"], "recipient_id": provider["id"],
+    }, headers=auth_headers).json()
+    async_client.delete(f"/expenses/{created['id']}", headers=auth_headers)
+
+    changes = async_client.get("/expenses/changes", params={"since": start["cursor"]}, headers=auth_headers).json()
+    assert changes["upserted"] == [] and changes["deleted"] == [created["id"]]
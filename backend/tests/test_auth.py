@@ -0,0 +1,155 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from auth import PrincipalCache, principal_cache
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Part 1 — PrincipalCache unit tests
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestPrincipalCache:
+    def test_hit_and_miss_counters(self):
+        cache = PrincipalCache(maxsize=4, ttl=60)
+        assert cache.get("ana") is None
+        cache.put("ana", "snapshot")
+        assert cache.get("ana") == "snapshot"
+        assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    def test_evicts_least_recently_used(self):
+        cache = PrincipalCache(maxsize=2, ttl=60)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+
+    def test_expired_entries_miss(self):
+        cache = PrincipalCache(maxsize=2, ttl=-1)
+        cache.put("a", 1)
+        assert cache.get("a") is None
+        assert cache.stats()["size"] == 0
+
+    def test_invalidate(self):
+        cache = PrincipalCache(maxsize=2, ttl=60)
+        cache.put("a", 1)
+        cache.invalidate("a")
+        assert cache.get("a") is None
+
+    def test_put_after_invalidate_is_dropped(self):
+        cache = PrincipalCache(maxsize=2, ttl=60)
+        # A request misses and reads the row...
+        assert cache.get("a") is None
+        generation = cache.generation("a")
+        # ...while an admin commits a change and invalidates...
+        cache.invalidate("a")
+        # ...so the request's stale copy must not be cached
+        cache.put("a", "stale", generation)
+        assert cache.get("a") is None
+
+        # The next request reads after the change and caches normally
+        cache.put("a", "fresh", cache.generation("a"))
+        assert cache.get("a") == "fresh"
+        assert cache.generation("b") == 0
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Part 2 — get_current_user skips the DB on hits and honours invalidation
+# ──────────────────────────────────────────────────────────────────────────────
+
+def test_cached_principal_skips_user_query(client, auth_headers, query_budget):
+    client.get("/auth/me", headers=auth_headers)
+    res = client.get("/auth/me", headers=auth_headers)
+    assert res.status_code == 200
+    assert res.json()["username"] == "testuser"
+    query_budget(res, 0)
+
+
+def test_deactivation_takes_effect_immediately(client, admin_headers):
+    client.post("/auth/register", json={"username": "shortlived", "email": "s@test.com", "password": "pw"})
+    token = client.post("/auth/login", data={"username": "shortlived", "password": "pw"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    me = client.get("/auth/me", headers=headers)
+    assert me.status_code == 200
+
+    res = client.patch(f"/users/{me.json()['id']}/activate", headers=admin_headers)
+    assert res.json()["is_active"] is False
+    assert client.get("/auth/me", headers=headers).status_code == 401
+
+
+def test_deletion_invalidates_after_commit(client, admin_headers, monkeypatch):
+    from sqlalchemy import select
+    from models import User
+    from tests.conftest import TestSessionLocal
+
+    client.post("/auth/register", json={"username": "deletedsoon", "email": "d@test.com", "password": "pw"})
+    token = client.post("/auth/login", data={"username": "deletedsoon", "password": "pw"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    me = client.get("/auth/me", headers=headers)
+    assert me.status_code == 200
+
+    # A request racing the delete must not be able to re-cache the row
+    row_present = []
+    invalidate = principal_cache.invalidate
+
+    def recording_invalidate(username):
+        with TestSessionLocal() as db:
+            row_present.append(db.scalar(select(User.id).where(User.username == username)) is not None)
+        invalidate(username)
+
+    monkeypatch.setattr(principal_cache, "invalidate", recording_invalidate)
+    assert client.delete(f"/users/{me.json()['id']}", headers=admin_headers).status_code == 204
+    assert row_present == [False]
+    assert client.get("/auth/me", headers=headers).status_code == 401
+
+
+def test_stats_endpoint(client, admin_headers):
+    res = client.get("/users/auth-cache", headers=admin_headers)
+    assert res.status_code == 200
+    assert set(res.json()) == {"hits", "misses", "size"}
+    assert res.json()["hits"] <= principal_cache.stats()["hits"]
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Part 3 — bcrypt pool: cost upgrades and fast rejection under overload
+# ──────────────────────────────────────────────────────────────────────────────
+
+def test_password_needs_rehash(monkeypatch):
+    import auth
+
+    monkeypatch.setattr(auth, "BCRYPT_ROUNDS", 4)
+    hashed = auth.hash_password("pw")
+    assert hashed.split("$")[2] == "04"
+    assert not auth.password_needs_rehash(hashed)
+    monkeypatch.setattr(auth, "BCRYPT_ROUNDS", 5)
+    assert auth.password_needs_rehash(hashed)
+
+
+def test_login_upgrades_hash_cost(client, monkeypatch):
+    import auth
+    from models import User
+    from tests.conftest import TestSessionLocal
+
+    client.post("/auth/register", json={"username": "rehash", "email": "r@test.com", "password": "pw"})
+    monkeypatch.setattr(auth, "BCRYPT_ROUNDS", 4)
+    assert client.post("/auth/login", data={"username": "rehash", "password": "pw"}).status_code == 200
+
+    db = TestSessionLocal()
+    hashed = db.query(User).filter(User.username == "rehash").one().hashed_password
+    db.close()
+    assert hashed.split("$")[2] == "04"
+    assert client.post("/auth/login", data={"username": "rehash", "password": "pw"}).status_code == 200
+
+
+def test_login_rejected_when_hash_pool_saturated(client, monkeypatch):
+    import threading
+    import auth
+
+    monkeypatch.setattr(auth, "_hash_slots", threading.BoundedSemaphore(1))
+    auth._hash_slots.acquire()
+    res = client.post("/auth/login", data={"username": "testuser", "password": "testpass"})
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import build_engine, describe_engine, pool_options, POOL_SIZE
+
+
+def test_sqlite_profile_applied_on_connect(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+    assert engine.pool.size() == POOL_SIZE
+    engine.dispose()
+
+
+def test_describe_engine(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'describe.db'}")
+    line = describe_engine(engine)
+    assert "pool=QueuePool" in line and "journal_mode=wal" in line
+    engine.dispose()
+
+
+def test_in_memory_sqlite_skips_pool_sizing():
+    assert pool_options("sqlite://") == {}
+    assert pool_options("sqlite:///:memory:") == {}
+    assert pool_options("postgresql://u:p@localhost/db")["pool_size"] == POOL_SIZE
+
+
+def test_query_count_header_only_in_debug(client, auth_headers, query_budget, monkeypatch):
+    import main
+
+    res = client.get("/categories", headers=auth_headers)
+    assert int(res.headers["X-Query-Count"]) >= 0
+    monkeypatch.setattr(main, "DEBUG", False)
+    assert "X-Query-Count" not in client.get("/categories", headers=auth_headers).headers
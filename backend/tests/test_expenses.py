@@ -0,0 +1,793 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Fixtures — a provider/recipient pair and a small dated expense history
+# ──────────────────────────────────────────────────────────────────────────────
+
+@pytest.fixture(scope="module")
+def persons(client, auth_headers):
+    provider = client.post(
+        "/persons",
+        json={"name": "Farmacia Central", "type": "Company", "rut": "76.123.456-7"},
+        headers=auth_headers,
+    ).json()
+    recipient = client.post(
+        "/persons",
+        json={"name": "Ana", "type": "Individual", "rut": "12.345.678-5", "relation": "Self"},
+        headers=auth_headers,
+    ).json()
+    return provider, recipient
+
+
+@pytest.fixture(scope="module")
+def expense_history(client, auth_headers, persons):
+    provider, recipient = persons
+    created = []
+    for i in range(7):
+        res = client.post(
+            "/expenses",
+            json={
+                "title": f"Compra {i}",
+                "amount": 1000.0 * (i + 1),
+                "category": "Health" if i % 2 else "Food",
+                # Two expenses per day so the id tiebreaker is exercised
+                "date": f"2024-03-{10 + i // 2:02d}",
+                "provider_id": provider["id"],
+                "recipient_id": recipient["id"],
+            },
+            headers=auth_headers,
+        )
+        assert res.status_code == 201, res.text
+        created.append(res.json())
+    return created
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# GET /expenses — keyset pagination and server-side filters
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestListPagination:
+    def test_pages_follow_date_desc_id_desc(self, client, auth_headers, expense_history):
+        params = {"date_from": "2024-03-01", "date_to": "2024-03-31", "limit": 3}
+        seen = []
+        cursor = None
+        while True:
+            res = client.get(
+                "/expenses",
+                params={**params, **({"cursor": cursor} if cursor else {})},
+                headers=auth_headers,
+            )
+            assert res.status_code == 200
+            page = res.json()
+            assert len(page) <= 3
+            seen.extend(page)
+            cursor = res.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+        expected = sorted(expense_history, key=lambda e: (e["date"], e["id"]), reverse=True)
+        assert [e["id"] for e in seen] == [e["id"] for e in expected]
+
+    def test_last_page_has_no_cursor(self, client, auth_headers, expense_history):
+        res = client.get(
+            "/expenses",
+            params={"date_from": "2024-03-01", "date_to": "2024-03-31", "limit": 50},
+            headers=auth_headers,
+        )
+        assert len(res.json()) == len(expense_history)
+        assert "X-Next-Cursor" not in res.headers
+
+    def test_invalid_cursor(self, client, auth_headers):
+        res = client.get("/expenses", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+        assert res.status_code == 400
+
+    def test_limit_is_bounded(self, client, auth_headers):
+        res = client.get("/expenses", params={"limit": 10_000}, headers=auth_headers)
+        assert res.status_code == 422
+
+
+class TestListFilters:
+    def test_category(self, client, auth_headers, expense_history):
+        res = client.get(
+            "/expenses",
+            params={"category": "Health", "date_from": "2024-03-01", "date_to": "2024-03-31"},
+            headers=auth_headers,
+        )
+        data = res.json()
+        assert data and all(e["category"] == "Health" for e in data)
+
+    def test_amount_range(self, client, auth_headers, expense_history):
+        res = client.get(
+            "/expenses",
+            params={"min_amount": 2000, "max_amount": 4000, "date_from": "2024-03-01", "date_to": "2024-03-31"},
+            headers=auth_headers,
+        )
+        assert sorted(e["amount"] for e in res.json()) == [2000.0, 3000.0, 4000.0]
+
+    def test_date_range(self, client, auth_headers, expense_history):
+        res = client.get(
+            "/expenses",
+            params={"date_from": "2024-03-11", "date_to": "2024-03-11"},
+            headers=auth_headers,
+        )
+        assert {e["date"] for e in res.json()} == {"2024-03-11"}
+
+    def test_person_filters(self, client, auth_headers, persons, expense_history):
+        provider, recipient = persons
+        res = client.get(
+            "/expenses",
+            params={
+                "provider_id": provider["id"],
+                "recipient_id": recipient["id"],
+                "date_from": "2024-03-01",
+                "date_to": "2024-03-31",
+            },
+            headers=auth_headers,
+        )
+        assert len(res.json()) == len(expense_history)
+        res = client.get("/expenses", params={"provider_id": recipient["id"]}, headers=auth_headers)
+        assert res.json() == []
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# GET /expenses/summary — SQL-side aggregates
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestSummary:
+    def test_totals_within_date_bounds(self, client, auth_headers, persons, expense_history):
+        provider, recipient = persons
+        res = client.get(
+            "/expenses/summary",
+            params={"date_from": "2024-03-01", "date_to": "2024-03-31"},
+            headers=auth_headers,
+        )
+        assert res.status_code == 200
+        data = res.json()
+        amounts = [e["amount"] for e in expense_history]
+
+        assert data["total"] == sum(amounts)
+        assert data["count"] == len(amounts)
+        assert data["largest"] == max(amounts)
+        assert data["by_month"] == [{"key": "2024-03", "total": sum(amounts), "count": len(amounts)}]
+
+        by_category = {row["key"]: row["total"] for row in data["by_category"]}
+        assert by_category == {
+            "Food": sum(e["amount"] for e in expense_history if e["category"] == "Food"),
+            "Health": sum(e["amount"] for e in expense_history if e["category"] == "Health"),
+        }
+        assert [r["person_id"] for r in data["by_provider"]] == [provider["id"]]
+        assert [r["name"] for r in data["by_recipient"]] == [recipient["name"]]
+
+    def test_empty_range(self, client, auth_headers):
+        res = client.get(
+            "/expenses/summary",
+            params={"date_from": "1990-01-01", "date_to": "1990-12-31"},
+            headers=auth_headers,
+        )
+        data = res.json()
+        assert data["total"] == 0 and data["count"] == 0 and data["largest"] == 0
+        assert data["by_month"] == [] and data["by_category"] == []
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Query budgets — persons must be loaded in bulk, not once per row
+# (auth user lookup + the endpoint's own statements)
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestQueryBudget:
+    def test_list_is_constant_in_rows(self, client, auth_headers, expense_history, query_budget):
+        small = client.get("/expenses", params={"limit": 1}, headers=auth_headers)
+        large = client.get("/expenses", params={"limit": 50}, headers=auth_headers)
+        assert len(large.json()) > 1
+        assert query_budget(large, 2) == query_budget(small, 2)
+
+    def test_create_and_update(self, client, auth_headers, persons, query_budget):
+        provider, recipient = persons
+        payload = {
+            "title": "Budget check",
+            "amount": 100.0,
+            "category": "Other",
+            "date": "2023-01-01",
+            "provider_id": provider["id"],
+            "recipient_id": recipient["id"],
+        }
+        # INSERT, rollup upsert, version bump, search index, reload with persons
+        res = client.post("/expenses", json=payload, headers=auth_headers)
+        query_budget(res, 5)
+        # ... plus the ownership SELECT up front
+        res = client.put(
+            f"/expenses/{res.json()['id']}",
+            json={**payload, "amount": 200.0},
+            headers=auth_headers,
+        )
+        # (an amount-only edit leaves the search index alone)
+        query_budget(res, 5)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# POST /expenses/import — streaming CSV / NDJSON ingestion
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestImport:
+    def test_csv_with_row_errors(self, client, auth_headers, persons):
+        provider, recipient = persons
+        csv_body = (
+            "title,amount,category,date,note,provider_id,recipient_id\n"
+            f"Uber,3500,Transport,2021-02-01,,{provider['id']},{recipient['id']}\n"
+            f"Metro,not-a-number,Transport,2021-02-02,,{provider['id']},{recipient['id']}\n"
+            f"Taxi,8000,Transport,2021-02-03,night,{provider['id']},999999\n"
+            f"Bus,700,Transport,2021-02-04,,{provider['id']},{recipient['id']}\n"
+        )
+        res = client.post(
+            "/expenses/import",
+            files={"file": ("statement.csv", csv_body.encode(), "text/csv")},
+            headers=auth_headers,
+        )
+        assert res.status_code == 200, res.text
+        data = res.json()
+        assert data["inserted"] == 2 and data["failed"] == 2
+        assert [e["row"] for e in data["errors"]] == [2, 3]
+        assert "amount" in data["errors"][0]["detail"]
+        assert "999999" in data["errors"][1]["detail"]
+
+        listed = client.get(
+            "/expenses", params={"date_from": "2021-02-01", "date_to": "2021-02-28"}, headers=auth_headers,
+        ).json()
+        assert sorted(e["title"] for e in listed) == ["Bus", "Uber"]
+
+    def test_ndjson_in_batches(self, client, auth_headers, persons, monkeypatch):
+        import routes.expenses
+
+        monkeypatch.setattr(routes.expenses, "IMPORT_BATCH_SIZE", 2)
+        provider, recipient = persons
+        lines = [
+            '{"title": "Row %d", "amount": %d, "category": "Bulk", "date": "2020-05-%02d", '
+            '"provider_id": %d, "recipient_id": %d}' % (i, 100 * i, i, provider["id"], recipient["id"])
+            for i in range(1, 6)
+        ]
+        lines.insert(2, "{broken")
+        res = client.post(
+            "/expenses/import",
+            files={"file": ("rows.ndjson", "\n".join(lines).encode(), "application/x-ndjson")},
+            headers=auth_headers,
+        )
+        data = res.json()
+        assert data["inserted"] == 5 and data["failed"] == 1
+        assert data["errors"][0]["row"] == 3
+
+    def test_ndjson_rows_must_be_objects(self, client, auth_headers):
+        body = '"hello"\n42\n[1, 2]\n'
+        res = client.post(
+            "/expenses/import",
+            files={"file": ("rows.ndjson", body.encode(), "application/x-ndjson")},
+            headers=auth_headers,
+        )
+        data = res.json()
+        assert data["inserted"] == 0 and data["failed"] == 3
+        assert [e["row"] for e in data["errors"]] == [1, 2, 3]
+        assert all("expected an object" in e["detail"] for e in data["errors"])
+        assert data["errors"][0]["detail"] != "hello"
+
+    def test_rejects_unknown_format(self, client, auth_headers):
+        res = client.post(
+            "/expenses/import",
+            files={"file": ("rows.xlsx", b"...", "application/octet-stream")},
+            headers=auth_headers,
+        )
+        assert res.status_code == 415
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# GET /expenses/export — streamed CSV / NDJSON
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestExport:
+    params = {"date_from": "2024-03-01", "date_to": "2024-03-31"}
+
+    def test_csv(self, client, auth_headers, persons, expense_history, monkeypatch):
+        import routes.expenses
+
+        monkeypatch.setattr(routes.expenses, "EXPORT_CHUNK_ROWS", 2)
+        res = client.get("/expenses/export", params=self.params, headers=auth_headers)
+        assert res.status_code == 200
+        assert res.headers["content-type"].startswith("text/csv")
+        lines = res.text.strip().splitlines()
+        assert lines[0].startswith("id,date,title,amount")
+        assert len(lines) == len(expense_history) + 1
+        assert persons[0]["name"] in lines[1] and persons[1]["name"] in lines[1]
+
+    def test_ndjson_matches_list_order(self, client, auth_headers, expense_history):
+        import json
+
+        res = client.get("/expenses/export", params={**self.params, "format": "ndjson"}, headers=auth_headers)
+        rows = [json.loads(line) for line in res.text.splitlines()]
+        listed = client.get("/expenses", params=self.params, headers=auth_headers).json()
+        assert [r["id"] for r in rows] == [e["id"] for e in listed]
+        assert rows[0]["date"] == listed[0]["date"]
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Monthly rollups — kept in step with every write path
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestRollups:
+    year = {"date_from": "2019-01-01", "date_to": "2019-12-31"}
+
+    def _summary(self, client, auth_headers):
+        return client.get("/expenses/summary", params=self.year, headers=auth_headers).json()
+
+    def test_update_moves_between_buckets(self, client, auth_headers, persons):
+        provider, recipient = persons
+        payload = {
+            "title": "Rollup move",
+            "amount": 400.0,
+            "category": "Food",
+            "date": "2019-01-15",
+            "provider_id": provider["id"],
+            "recipient_id": recipient["id"],
+        }
+        expense_id = client.post("/expenses", json=payload, headers=auth_headers).json()["id"]
+        data = self._summary(client, auth_headers)
+        assert data["by_month"] == [{"key": "2019-01", "total": 400.0, "count": 1}]
+
+        client.put(
+            f"/expenses/{expense_id}",
+            json={**payload, "amount": 650.0, "category": "Travel", "date": "2019-02-03"},
+            headers=auth_headers,
+        )
+        data = self._summary(client, auth_headers)
+        assert data["by_month"] == [{"key": "2019-02", "total": 650.0, "count": 1}]
+        assert data["by_category"] == [{"key": "Travel", "total": 650.0, "count": 1}]
+        assert data["largest"] == 650.0
+
+        client.delete(f"/expenses/{expense_id}", headers=auth_headers)
+        data = self._summary(client, auth_headers)
+        assert data["total"] == 0 and data["by_month"] == [] and data["by_category"] == []
+
+    def test_partial_month_reads_expenses(self, client, auth_headers, expense_history):
+        res = client.get(
+            "/expenses/summary",
+            params={"date_from": "2024-03-11", "date_to": "2024-03-11"},
+            headers=auth_headers,
+        )
+        expected = [e["amount"] for e in expense_history if e["date"] == "2024-03-11"]
+        assert res.json()["total"] == sum(expected)
+
+    def test_all_write_paths_match_expenses(self, client, auth_headers, expense_history):
+        import rollups
+        from tests.conftest import TestSessionLocal
+
+        # By now the module has created, updated, deleted and bulk-imported rows
+        with TestSessionLocal() as db:
+            assert rollups.verify(db) == []
+
+    def test_rebuild_repairs_drift(self, client, auth_headers, expense_history):
+        import rollups
+        from sqlalchemy import update
+        from models import ExpenseRollup
+        from tests.conftest import TestSessionLocal
+
+        with TestSessionLocal() as db:
+            db.execute(update(ExpenseRollup).where(ExpenseRollup.year_month == 202403).values(total=1.0))
+            db.commit()
+            drift = rollups.verify(db)
+            assert drift and {m["year_month"] for m in drift} == {202403}
+
+            assert rollups.rebuild(db) > 0
+            db.commit()
+            assert rollups.verify(db) == []
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Conditional GET — version counters as weak ETags
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestConditionalGet:
+    def _etag(self, client, path, headers):
+        res = client.get(path, headers=headers)
+        assert res.status_code == 200
+        return res.headers["ETag"]
+
+    def test_revalidation_skips_the_list_query(self, client, auth_headers, expense_history, query_budget):
+        etag = self._etag(client, "/expenses", auth_headers)
+        assert etag.startswith('W/"')
+
+        res = client.get("/expenses", headers={**auth_headers, "If-None-Match": etag})
+        assert res.status_code == 304 and res.content == b""
+        assert res.headers["ETag"] == etag
+        query_budget(res, 1)  # the version lookup only
+
+    def test_writes_bump_only_their_collection(self, client, auth_headers):
+        expenses = self._etag(client, "/expenses", auth_headers)
+        categories = self._etag(client, "/categories", auth_headers)
+
+        client.post("/categories", json={"name": "Versioned"}, headers=auth_headers)
+        assert self._etag(client, "/categories", auth_headers) != categories
+        assert self._etag(client, "/expenses", auth_headers) == expenses
+
+    def test_person_edit_changes_expense_list(self, client, auth_headers, persons, expense_history):
+        provider, _ = persons
+        expenses = self._etag(client, "/expenses", auth_headers)
+        people = self._etag(client, "/persons", auth_headers)
+
+        client.put(
+            f"/persons/{provider['id']}",
+            json={"name": "Farmacia Central Ltda.", "type": "Company", "rut": provider["rut"]},
+            headers=auth_headers,
+        )
+        assert self._etag(client, "/persons", auth_headers) != people
+        res = client.get("/expenses", headers={**auth_headers, "If-None-Match": expenses})
+        assert res.status_code == 200
+
+    def test_import_bumps_expenses(self, client, auth_headers, persons):
+        provider, recipient = persons
+        etag = self._etag(client, "/expenses", auth_headers)
+        csv_body = (
+            "title,amount,category,date,provider_id,recipient_id\n"
+            f"Versioned,100,Other,2018-01-01,{provider['id']},{recipient['id']}\n"
+        )
+        client.post(
+            "/expenses/import",
+            files={"file": ("rows.csv", csv_body.encode(), "text/csv")},
+            headers=auth_headers,
+        )
+        assert self._etag(client, "/expenses", auth_headers) != etag
+
+    def test_tags_are_per_user(self, client, auth_headers, admin_headers):
+        etag = self._etag(client, "/categories", auth_headers)
+        res = client.get("/categories", headers={**admin_headers, "If-None-Match": etag})
+        assert res.status_code == 200
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# GET /expenses/changes — delta sync with tombstones
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestChanges:
+    def _sync(self, client, auth_headers, cursor=None, limit=None):
+        params = {k: v for k, v in (("since", cursor), ("limit", limit)) if v is not None}
+        res = client.get("/expenses/changes", params=params, headers=auth_headers)
+        assert res.status_code == 200, res.text
+        return res.json()
+
+    def _drain(self, client, auth_headers, cursor=None, limit=None):
+        upserted, deleted = {}, set()
+        while True:
+            page = self._sync(client, auth_headers, cursor, limit)
+            for expense_id in page["deleted"]:
+                upserted.pop(expense_id, None)
+                deleted.add(expense_id)
+            upserted.update({e["id"]: e for e in page["upserted"]})
+            cursor = page["cursor"]
+            if not page["has_more"]:
+                return upserted, deleted, cursor
+
+    def test_full_sync_matches_list(self, client, auth_headers, expense_history):
+        synced, _, _ = self._drain(client, auth_headers, limit=3)
+        listed = client.get("/expenses", params={"limit": 500}, headers=auth_headers).json()
+        assert set(synced) == {e["id"] for e in listed}
+
+    def test_only_changes_since_cursor(self, client, auth_headers, persons):
+        provider, recipient = persons
+        _, _, cursor = self._drain(client, auth_headers)
+        assert self._sync(client, auth_headers, cursor) == {
+            "upserted": [], "deleted": [], "cursor": cursor, "has_more": False,
+        }
+
+        payload = {
+            "title": "Delta", "amount": 10.0, "category": "Other", "date": "2017-01-01",
+            "provider_id": provider["id"], "recipient_id": recipient["id"],
+        }
+        kept = client.post("/expenses", json=payload, headers=auth_headers).json()
+        gone = client.post("/expenses", json=payload, headers=auth_headers).json()
+        client.put(f"/expenses/{kept['id']}", json={**payload, "amount": 12.0}, headers=auth_headers)
+        client.delete(f"/expenses/{gone['id']}", headers=auth_headers)
+
+        upserted, deleted, _ = self._drain(client, auth_headers, cursor)
+        assert list(upserted) == [kept["id"]] and upserted[kept["id"]]["amount"] == 12.0
+        assert upserted[kept["id"]]["updated_at"]
+        assert deleted == {gone["id"]}
+
+    def test_import_rows_share_a_sequence(self, client, auth_headers, persons):
+        provider, recipient = persons
+        _, _, cursor = self._drain(client, auth_headers)
+        csv_body = "title,amount,category,date,provider_id,recipient_id\n" + "".join(
+            f"Delta {i},{i},Other,2017-02-0{i},{provider['id']},{recipient['id']}\n" for i in range(1, 6)
+        )
+        client.post(
+            "/expenses/import",
+            files={"file": ("rows.csv", csv_body.encode(), "text/csv")},
+            headers=auth_headers,
+        )
+        # A page boundary inside one sequence number must not skip rows
+        upserted, _, _ = self._drain(client, auth_headers, cursor, limit=2)
+        assert sorted(e["title"] for e in upserted.values()) == [f"Delta {i}" for i in range(1, 6)]
+
+    def test_person_edit_resyncs_its_expenses(self, client, auth_headers, persons):
+        _, recipient = persons
+        shop = {"name": "Delta Shop", "type": "Company", "rut": "5.555.555-5"}
+        provider = client.post("/persons", json=shop, headers=auth_headers).json()
+        expense = client.post("/expenses", json={
+            "title": "Delta person", "amount": 10.0, "category": "Other", "date": "2017-03-01",
+            "provider_id": provider["id"], "recipient_id": recipient["id"],
+        }, headers=auth_headers).json()
+        _, _, cursor = self._drain(client, auth_headers)
+
+        client.put(f"/persons/{provider['id']}", json={**shop, "name": "Delta Shop Renamed"}, headers=auth_headers)
+        upserted, _, _ = self._drain(client, auth_headers, cursor)
+        assert list(upserted) == [expense["id"]]
+        assert upserted[expense["id"]]["provider"]["name"] == "Delta Shop Renamed"
+        assert upserted[expense["id"]]["updated_at"] > expense["updated_at"]
+
+    def test_invalid_cursor(self, client, auth_headers):
+        res = client.get("/expenses/changes", params={"since": "garbage"}, headers=auth_headers)
+        assert res.status_code == 400
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# POST /expenses/batch — many mutations, one transaction
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestBatch:
+    def _payload(self, persons, **overrides):
+        provider, recipient = persons
+        return {
+            "title": "Batch", "amount": 50.0, "category": "Food", "date": "2016-05-01",
+            "provider_id": provider["id"], "recipient_id": recipient["id"], **overrides,
+        }
+
+    def _create(self, client, auth_headers, persons, n):
+        ops = [{"op": "create", "data": self._payload(persons, title=f"Batch {i}")} for i in range(n)]
+        res = client.post("/expenses/batch", json={"operations": ops}, headers=auth_headers)
+        assert res.status_code == 200, res.text
+        return res.json()
+
+    def test_mixed_operations(self, client, auth_headers, persons):
+        created = self._create(client, auth_headers, persons, 3)
+        assert created["applied"] == 3 and created["failed"] == 0
+        ids = [r["id"] for r in created["results"]]
+        assert all(r["status"] == 201 and r["expense"]["provider"] for r in created["results"])
+
+        ops = [
+            {"op": "update", "id": ids[0], "data": self._payload(persons, category="Travel")},
+            {"op": "delete", "id": ids[1]},
+            {"op": "update", "id": ids[1], "data": self._payload(persons)},
+            {"op": "delete", "id": 999999},
+            {"op": "update", "id": ids[2], "data": self._payload(persons, provider_id=999999)},
+        ]
+        data = client.post(
+            "/expenses/batch", json={"operations": ops, "atomic": False}, headers=auth_headers,
+        ).json()
+        assert [r["status"] for r in data["results"]] == [200, 204, 404, 404, 422]
+        assert data["applied"] == 2 and data["failed"] == 3
+        assert data["results"][0]["expense"]["category"] == "Travel"
+
+        summary = client.get(
+            "/expenses/summary", params={"date_from": "2016-05-01", "date_to": "2016-05-31"}, headers=auth_headers,
+        ).json()
+        assert {r["key"]: r["count"] for r in summary["by_category"]} == {"Food": 1, "Travel": 1}
+
+    def test_atomic_by_default(self, client, auth_headers, persons):
+        from models import Expense
+        from tests.conftest import TestSessionLocal
+
+        ids = [r["id"] for r in self._create(client, auth_headers, persons, 2)["results"]]
+
+        ops = [
+            {"op": "create", "data": self._payload(persons, title="Never written")},
+            {"op": "update", "id": ids[0], "data": self._payload(persons, amount=999.0)},
+            {"op": "delete", "id": ids[1]},
+            {"op": "delete", "id": 999999},
+        ]
+        data = client.post("/expenses/batch", json={"operations": ops}, headers=auth_headers).json()
+        assert [r["status"] for r in data["results"]] == [424, 424, 424, 404]
+        assert data["applied"] == 0 and data["failed"] == 4
+        assert data["results"][0]["id"] is None and "operation 3" in data["results"][0]["detail"]
+
+        with TestSessionLocal() as db:
+            assert {e.id: e.amount for e in db.query(Expense).filter(Expense.id.in_(ids))} == {
+                ids[0]: 50.0, ids[1]: 50.0,
+            }
+        found = client.get("/expenses/search", params={"q": "Never written"}, headers=auth_headers)
+        assert found.json() == []
+
+    def test_foreign_expenses_are_rejected(self, client, auth_headers, admin_headers, persons):
+        ids = [r["id"] for r in self._create(client, auth_headers, persons, 1)["results"]]
+        res = client.post(
+            "/expenses/batch", json={"operations": [{"op": "delete", "id": ids[0]}]}, headers=admin_headers,
+        )
+        assert res.json()["results"][0]["status"] == 204  # admins may touch any expense
+
+        other = client.post("/auth/register", json={"username": "batchother", "email": "b@o.com", "password": "pw"})
+        token = client.post("/auth/login", data={"username": "batchother", "password": "pw"}).json()["access_token"]
+        ids = [r["id"] for r in self._create(client, auth_headers, persons, 1)["results"]]
+        res = client.post(
+            "/expenses/batch",
+            json={"operations": [{"op": "delete", "id": ids[0]}]},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert other.status_code in (200, 201)
+        assert res.json()["results"][0]["status"] == 403
+
+    def test_malformed_operation(self, client, auth_headers):
+        res = client.post("/expenses/batch", json={"operations": [{"op": "update", "id": 1}]}, headers=auth_headers)
+        assert res.status_code == 422
+
+    def test_statements_do_not_grow_with_batch(self, client, auth_headers, persons, query_budget):
+        counts = []
+        for n in (2, 20):
+            ids = [r["id"] for r in self._create(client, auth_headers, persons, n)["results"]]
+            ops = [{"op": "update", "id": i, "data": self._payload(persons, amount=75.0)} for i in ids]
+            res = client.post("/expenses/batch", json={"operations": ops}, headers=auth_headers)
+            # expenses + persons lookup, UPDATE (executemany), rollup upsert,
+            # version bump, search index, reload with persons
+            counts.append(query_budget(res, 7))
+        assert counts[0] == counts[1]
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# FAST_JSON — list responses must not change, only get cheaper
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestFastJson:
+    @pytest.mark.parametrize("path, params", [
+        ("/expenses", {"limit": 3}),
+        ("/categories", {}),
+        ("/persons", {}),
+    ])
+    def test_same_body_and_headers(self, client, auth_headers, expense_history, monkeypatch, path, params):
+        import fast_json
+
+        default = client.get(path, params=params, headers=auth_headers)
+        monkeypatch.setattr(fast_json, "FAST_JSON", True)
+        fast = client.get(path, params=params, headers=auth_headers)
+        assert fast.status_code == 200
+        assert fast.json() == default.json()
+        assert fast.headers["content-type"] == "application/json"
+        for header in ("ETag", "X-Next-Cursor"):
+            assert fast.headers.get(header) == default.headers.get(header)
+
+    def test_without_orjson(self, client, auth_headers, expense_history, monkeypatch):
+        import fast_json
+
+        default = client.get("/expenses", headers=auth_headers).json()
+        monkeypatch.setattr(fast_json, "FAST_JSON", True)
+        monkeypatch.setattr(fast_json, "orjson", None)
+        assert client.get("/expenses", headers=auth_headers).json() == default
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# GET /expenses/search — indexed full-text search
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestSearch:
+    def _create(self, client, auth_headers, persons, **fields):
+        provider, recipient = persons
+        payload = {
+            "title": "Search", "amount": 10.0, "category": "Other", "date": "2015-01-01",
+            "provider_id": provider["id"], "recipient_id": recipient["id"], **fields,
+        }
+        res = client.post("/expenses", json=payload, headers=auth_headers)
+        assert res.status_code == 201, res.text
+        return res.json()
+
+    def _search(self, client, auth_headers, q, **params):
+        res = client.get("/expenses/search", params={"q": q, **params}, headers=auth_headers)
+        assert res.status_code == 200, res.text
+        return res
+
+    def _ids(self, client, auth_headers, q, **params):
+        return [e["id"] for e in self._search(client, auth_headers, q, **params).json()]
+
+    def test_title_note_and_names(self, client, auth_headers, persons):
+        by_title = self._create(client, auth_headers, persons, title="Quirófano Zanahoria")
+        by_note = self._create(client, auth_headers, persons, title="Otro", note="zanahorias moradas")
+        # Prefix, diacritic- and case-insensitive; title hits rank first
+        assert self._ids(client, auth_headers, "ZANAHORIA") == [by_title["id"], by_note["id"]]
+        assert self._ids(client, auth_headers, "quirofano") == [by_title["id"]]
+        assert self._ids(client, auth_headers, "QUIRÓFANO") == [by_title["id"]]
+        # Every word must match; provider names are indexed too
+        assert self._ids(client, auth_headers, "farmacia quirofano") == [by_title["id"]]
+        assert self._ids(client, auth_headers, "zanahoria inexistente") == []
+
+    def test_postgres_folds_accents(self):
+        # Postgres' 'simple' configuration keeps accents; documents and
+        # queries both go through unaccent so it matches FTS5
+        import search
+        from sqlalchemy import column
+        from sqlalchemy.dialects import postgresql
+
+        dialect = postgresql.dialect()
+        query = str(search.search_statement("postgresql", ["quirófano"], []).compile(dialect=dialect))
+        assert "to_tsquery('simple'::regconfig, unaccent(" in query
+        document = str(search._tsvector(column("title"), "A").compile(dialect=dialect))
+        assert "to_tsvector('simple'::regconfig, unaccent(title))" in document
+
+    def test_filters_and_pagination(self, client, auth_headers, persons):
+        created = [
+            self._create(client, auth_headers, persons, title=f"Paginada {i}", category="Travel" if i % 2 else "Food")
+            for i in range(5)
+        ]
+        seen, cursor = [], None
+        while True:
+            res = self._search(client, auth_headers, "paginada", limit=2, **({"cursor": cursor} if cursor else {}))
+            seen += [e["id"] for e in res.json()]
+            cursor = res.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+        assert sorted(seen) == sorted(e["id"] for e in created)
+        travel = self._ids(client, auth_headers, "paginada", category="Travel")
+        assert sorted(travel) == sorted(e["id"] for e in created if e["category"] == "Travel")
+
+    def test_index_follows_writes(self, client, auth_headers, persons):
+        expense = self._create(client, auth_headers, persons, title="Berenjena")
+        payload = {k: expense[k] for k in ("amount", "category", "date", "provider_id", "recipient_id")}
+        client.put(f"/expenses/{expense['id']}", json={**payload, "title": "Pimentón"}, headers=auth_headers)
+        assert self._ids(client, auth_headers, "berenjena") == []
+        assert self._ids(client, auth_headers, "pimenton") == [expense["id"]]
+
+        client.delete(f"/expenses/{expense['id']}", headers=auth_headers)
+        assert self._ids(client, auth_headers, "pimenton") == []
+
+    def test_person_rename_reindexes(self, client, auth_headers, persons):
+        shop = client.post(
+            "/persons", json={"name": "Ferretería Uno", "type": "Company", "rut": "77.777.777-7"}, headers=auth_headers,
+        ).json()
+        expense = self._create(client, auth_headers, persons, provider_id=shop["id"])
+        assert self._ids(client, auth_headers, "ferreteria") == [expense["id"]]
+        client.put(f"/persons/{shop['id']}", json={**shop, "name": "Maderas Dos"}, headers=auth_headers)
+        assert self._ids(client, auth_headers, "ferreteria") == []
+        assert self._ids(client, auth_headers, "maderas") == [expense["id"]]
+
+    def test_imported_rows_are_indexed(self, client, auth_headers, persons):
+        provider, recipient = persons
+        body = f"title,amount,category,date,provider_id,recipient_id\nImportado Kiwi,100,Food,2015-02-01,{provider['id']},{recipient['id']}\n"
+        client.post("/expenses/import", files={"file": ("x.csv", body.encode(), "text/csv")}, headers=auth_headers)
+        assert len(self._ids(client, auth_headers, "kiwi")) == 1
+
+    def test_operators_are_plain_words(self, client, auth_headers, persons):
+        expense = self._create(client, auth_headers, persons, title="Sandía")
+        # Quotes, parentheses and operators never reach the index query
+        assert self._ids(client, auth_headers, '"sandia" OR* (') == []
+        assert self._ids(client, auth_headers, 'sandia" *)') == [expense["id"]]
+        assert self._ids(client, auth_headers, "!!!") == []
+        assert client.get("/expenses/search", params={"q": ""}, headers=auth_headers).status_code == 422
+
+    def test_query_budget(self, client, auth_headers, persons, query_budget):
+        self._create(client, auth_headers, persons, title="Presupuesto")
+        query_budget(self._search(client, auth_headers, "presupuesto"), 2)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# GET /persons/by-rut — indexed provider resolution
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestPersonByRut:
+    def test_any_formatting_matches(self, client, auth_headers, persons):
+        provider, _ = persons  # saved as "76.123.456-7"
+        for rut in ("76.123.456-7", "76123456-7", "076123456-7"):
+            res = client.get(f"/persons/by-rut/{rut}", headers=auth_headers)
+            assert res.status_code == 200 and res.json()["id"] == provider["id"]
+
+    def test_follows_edits(self, client, auth_headers):
+        person = client.post(
+            "/persons", json={"name": "Rut Edit", "type": "Individual", "rut": "3.333.333-3"}, headers=auth_headers,
+        ).json()
+        client.put(f"/persons/{person['id']}", json={**person, "rut": "4.444.444-4"}, headers=auth_headers)
+        assert client.get("/persons/by-rut/3333333-3", headers=auth_headers).status_code == 404
+        assert client.get("/persons/by-rut/4444444-4", headers=auth_headers).json()["id"] == person["id"]
+
+    def test_scoped_to_owner(self, client, admin_headers, persons):
+        assert client.get("/persons/by-rut/76.123.456-7", headers=admin_headers).status_code == 404
+
+    def test_invalid(self, client, auth_headers):
+        assert client.get("/persons/by-rut/not-a-rut", headers=auth_headers).status_code == 400
+
+    def test_query_budget(self, client, auth_headers, persons, query_budget):
+        query_budget(client.get("/persons/by-rut/76123456-7", headers=auth_headers), 2)
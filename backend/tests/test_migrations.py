@@ -0,0 +1,88 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import inspect, text
+
+import migrations
+from database import build_engine, count_queries
+
+# The shape of the database before schema versioning: no persons.relation,
+# no change tracking, no rollup / version / tombstone tables.
+LEGACY_SCHEMA = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR NOT NULL UNIQUE, email VARCHAR NOT NULL UNIQUE,"
+    " hashed_password VARCHAR NOT NULL, is_admin BOOLEAN, is_active BOOLEAN, created_at DATETIME,"
+    " profile_person_id INTEGER)",
+    "CREATE TABLE persons (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, type VARCHAR NOT NULL,"
+    " rut VARCHAR NOT NULL, user_id INTEGER NOT NULL)",
+    "CREATE TABLE categories (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, color VARCHAR NOT NULL,"
+    " user_id INTEGER NOT NULL)",
+    "CREATE TABLE expenses (id INTEGER PRIMARY KEY, title VARCHAR NOT NULL, amount FLOAT NOT NULL,"
+    " category VARCHAR NOT NULL, date DATE, note VARCHAR, user_id INTEGER NOT NULL,"
+    " provider_id INTEGER NOT NULL, recipient_id INTEGER NOT NULL)",
+    "INSERT INTO users (id, username, email, hashed_password) VALUES (1, 'old', 'old@x.com', 'x')",
+    "INSERT INTO persons (id, name, type, rut, user_id) VALUES (1, 'Shop', 'Company', '1-9', 1)",
+    "INSERT INTO expenses (title, amount, category, date, user_id, provider_id, recipient_id)"
+    " VALUES ('a', 10, 'Food', '2020-01-05', 1, 1, 1), ('b', 5, 'Food', '2020-01-20', 1, 1, 1)",
+]
+
+
+def test_fresh_database_is_created_and_stamped(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    result = migrations.upgrade(engine)
+    assert result["from"] is None and result["applied"] == ["create_all"]
+    with engine.connect() as conn:
+        assert migrations.current_version(conn) == migrations.LATEST
+        assert inspect(conn).has_table("expense_tombstones")
+    engine.dispose()
+
+
+def test_current_schema_costs_one_query(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'current.db'}")
+    migrations.upgrade(engine)
+    with count_queries() as counter:
+        result = migrations.upgrade(engine)
+    assert result["applied"] == []
+    assert counter[0] == 1
+    engine.dispose()
+
+
+def test_legacy_database_is_migrated(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+
+    result = migrations.upgrade(engine)
+    assert result["from"] == 0
+    assert len(result["applied"]) == len(migrations.MIGRATIONS)
+
+    with engine.connect() as conn:
+        columns = {c["name"] for c in inspect(conn).get_columns("expenses")}
+        assert {"updated_at", "change_seq"} <= columns
+        assert "relation" in {c["name"] for c in inspect(conn).get_columns("persons")}
+        indexes = {i["name"] for i in inspect(conn).get_indexes("expenses")}
+        assert {"ix_expenses_user_date_id", "ix_expenses_user_change_id"} <= indexes
+        # Rollups were seeded from the expenses already there
+        assert conn.execute(text("SELECT total, count FROM expense_rollups")).all() == [(15.0, 2)]
+        assert conn.execute(text("SELECT rut_canonical FROM persons")).scalar() == "19"
+        # Pre-tracking expenses count as written on their own date
+        assert conn.execute(text("SELECT min(updated_at) FROM expenses")).scalar().startswith("2020-01-05")
+        # ... and so was the search index
+        assert len(conn.execute(text("SELECT rowid FROM expense_search WHERE expense_search MATCH 'shop'")).all()) == 2
+        assert migrations.current_version(conn) == migrations.LATEST
+
+    # Re-running a step on an already-migrated schema changes nothing
+    with engine.begin() as conn:
+        for _, _, step in migrations.MIGRATIONS:
+            step(conn)
+    engine.dispose()
+
+
+def test_startup_report(client):
+    import main
+
+    timings = main.startup_timings
+    assert {"imports_ms", "routers_ms", "db_ms"} <= timings.keys()
+    assert timings["schema"]["to"] == migrations.LATEST
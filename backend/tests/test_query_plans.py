@@ -0,0 +1,202 @@
+"""Query-plan regression suite: no router query may full-scan a hot table.
+
+A database is seeded with a realistic spread (many users, one heavy one),
+analyzed, and every per-user query the routers issue is run through EXPLAIN
+QUERY PLAN (SQLite) or EXPLAIN with sequential scans disabled (Postgres, so
+a Seq Scan means no index can serve the query). Statements come from the
+same builders the routers use, so a change to a query or a dropped index
+fails here instead of in production.
+
+Runs on a temporary SQLite file by default; set QUERY_PLAN_DATABASE_URL to
+an empty scratch Postgres database to check its plans too.
+"""
+import datetime
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from sqlalchemy import insert, or_, select
+
+import migrations
+import rollups
+import search
+import versions
+from database import build_engine
+from models import Category, Expense, ExpenseTombstone, Person, User
+from routes.expenses import (
+    LIST_COLLECTIONS, _changed_rows_statement, _changes_statement, _encode_cursor, _export_statement,
+    _filter_conditions, _page_statement, _summary_statements,
+)
+from routes.persons import by_rut_statement, by_ruts_statement
+from receipt_parser import canonical_rut
+from schemas import ExpenseFilters
+
+USERS = 40
+EXPENSES_PER_USER = 250
+HEAVY_USER_EXPENSES = 5000
+PERSONS_PER_USER = 15
+CATEGORIES_PER_USER = 8
+TOMBSTONES_PER_USER = 20
+
+# Tables that grow with usage; a full scan of any of them is a regression
+HOT_TABLES = {
+    "expenses", "persons", "categories", "expense_tombstones", "expense_rollups", "collection_versions",
+}
+
+
+def _seed(conn):
+    rng = random.Random(7)
+    conn.execute(insert(User), [
+        {"id": u, "username": f"user{u}", "email": f"user{u}@test.com", "hashed_password": "x", "is_admin": False}
+        for u in range(1, USERS + 1)
+    ])
+    persons, categories, expenses, tombstones = [], [], [], []
+    for u in range(1, USERS + 1):
+        first_person = len(persons) + 1
+        for p in range(PERSONS_PER_USER):
+            rut = f"{10_000_000 + u * 100 + p}-{p % 10}"
+            # Core inserts skip the ORM validator that fills rut_canonical
+            persons.append({
+                "id": first_person + p, "user_id": u, "name": f"Person {u}-{p}", "type": "Company",
+                "rut": rut, "rut_canonical": canonical_rut(rut),
+            })
+        categories += [
+            {"user_id": u, "name": f"Category {c}", "color": "#6366f1"} for c in range(CATEGORIES_PER_USER)
+        ]
+        for i in range(HEAVY_USER_EXPENSES if u == 1 else EXPENSES_PER_USER):
+            expenses.append({
+                "user_id": u, "title": f"Compra {rng.choice(['pan', 'taxi', 'cine', 'luz'])} {i}",
+                "amount": rng.randint(500, 90_000), "category": f"Category {i % CATEGORIES_PER_USER}",
+                "date": datetime.date(2020, 1, 1) + datetime.timedelta(days=rng.randint(0, 1500)),
+                "provider_id": first_person + i % PERSONS_PER_USER,
+                "recipient_id": first_person + (i + 1) % PERSONS_PER_USER, "change_seq": i + 1,
+            })
+        tombstones += [
+            {"expense_id": 10_000_000 + u * 1000 + t, "user_id": u, "change_seq": t,
+             "deleted_at": datetime.datetime(2024, 1, 1)}
+            for t in range(TOMBSTONES_PER_USER)
+        ]
+    conn.execute(insert(Person), persons)
+    conn.execute(insert(Category), categories)
+    conn.execute(insert(Expense), expenses)
+    conn.execute(insert(ExpenseTombstone), tombstones)
+    rollups.rebuild(conn)
+    search.reindex(conn)
+    versions.bump(conn, {(u, c) for u in range(1, USERS + 1) for c in ("expenses", "categories", "persons")})
+
+
+@pytest.fixture(scope="module")
+def plan_db(tmp_path_factory):
+    url = os.getenv("QUERY_PLAN_DATABASE_URL") or f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}"
+    engine = build_engine(url)
+    migrations.upgrade(engine)
+    with engine.begin() as conn:
+        _seed(conn)
+        conn.exec_driver_sql("ANALYZE")
+    yield engine
+    if engine.dialect.name != "sqlite":
+        from database import Base
+
+        Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+def _explain(conn, stmt) -> list[str]:
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    if conn.dialect.name == "sqlite":
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+        return [row.detail for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled.string}", params)]
+    conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    return [row[0] for row in conn.exec_driver_sql(f"EXPLAIN {compiled.string}", compiled.params)]
+
+
+def _full_scans(dialect_name: str, plan: list[str]) -> set[str]:
+    if dialect_name == "sqlite":
+        # "SCAN expenses" / "SCAN persons_1" (an alias); SEARCH and virtual
+        # tables (FTS5) use an index
+        pattern = re.compile(r"^SCAN (\w+?)(?:_\d+)?(?: USING (?:COVERING )?INDEX \w+)?$")
+    else:
+        pattern = re.compile(r"Seq Scan on (\w+)")
+    scanned = {m.group(1) for line in plan if (m := pattern.search(line.strip()))}
+    return scanned & HOT_TABLES
+
+
+USER = User(id=1, is_admin=False)
+FILTERS = ExpenseFilters()
+PAGE_CURSOR = _encode_cursor(Expense(id=2500, date=datetime.date(2022, 6, 1)))
+
+
+def _queries():
+    """(name, statement) for every per-user query the routers run on hot tables."""
+    queries = {
+        "list": _page_statement(USER, FILTERS, None, 50),
+        "list after cursor": _page_statement(USER, FILTERS, PAGE_CURSOR, 50),
+        "list by category": _page_statement(USER, ExpenseFilters(category="Category 3"), None, 50),
+        "list by provider": _page_statement(USER, ExpenseFilters(provider_id=3), None, 50),
+        "list by date": _page_statement(
+            USER, ExpenseFilters(date_from=datetime.date(2021, 1, 5), date_to=datetime.date(2021, 2, 20)), None, 50,
+        ),
+        "changes": _changes_statement(USER, None, 500),
+        "changed rows": _changed_rows_statement([1, 2, 3]),
+        "export": _export_statement(USER, FILTERS),
+        "search": search.search_statement("sqlite", ["taxi"], _filter_conditions(USER, FILTERS)),
+        "etag": versions.version_statement(USER, LIST_COLLECTIONS),
+        "persons list": select(Person).where(Person.user_id == USER.id).order_by(Person.name),
+        "person by rut": by_rut_statement(USER.id, canonical_rut("10000103-3")),
+        "persons by scanned ruts": by_ruts_statement(
+            USER.id, {canonical_rut("10000103-3"), canonical_rut("10000104-4")},
+        ),
+        "owned persons": select(Person.id).where(Person.user_id == USER.id, Person.id.in_([1, 2, 3])),
+        "categories list": select(Category).where(Category.user_id == USER.id).order_by(Category.name),
+        "expenses of renamed person": select(Expense.id).where(
+            or_(Expense.provider_id.in_([3]), Expense.recipient_id.in_([3]))
+        ),
+    }
+    # Both summary paths: rollups (month-aligned) and raw expenses
+    for label, filters in (
+        ("rollup", FILTERS),
+        ("raw", ExpenseFilters(date_from=datetime.date(2021, 1, 5), min_amount=1000)),
+    ):
+        for key, stmt in _summary_statements(USER, filters).items():
+            queries[f"summary {label} {key}"] = stmt
+    return queries
+
+
+QUERIES = _queries()
+
+
+@pytest.mark.parametrize("name", QUERIES)
+def test_no_full_scan_of_hot_tables(plan_db, name):
+    stmt = QUERIES[name]
+    if name == "search" and plan_db.dialect.name != "sqlite":
+        stmt = search.search_statement(plan_db.dialect.name, ["taxi"], _filter_conditions(USER, FILTERS))
+    with plan_db.begin() as conn:
+        plan = _explain(conn, stmt)
+        conn.rollback()
+    scanned = _full_scans(plan_db.dialect.name, plan)
+    assert not scanned, f"{name} scans {sorted(scanned)}:\n" + "\n".join(plan)
+
+
+def test_detects_a_full_scan(plan_db):
+    # The check itself: an unindexed predicate must be reported
+    with plan_db.begin() as conn:
+        plan = _explain(conn, select(Expense.id).where(Expense.title == "pan"))
+        conn.rollback()
+    assert _full_scans(plan_db.dialect.name, plan) == {"expenses"}
+
+
+def test_cursor_pages_seek_by_date(plan_db):
+    # "No full scan" is not enough here: a SEARCH on user_id alone walks
+    # the user's rows from the newest one, so page N costs more than page 1
+    with plan_db.begin() as conn:
+        plan = _explain(conn, QUERIES["list after cursor"])
+        conn.rollback()
+    if plan_db.dialect.name == "sqlite":
+        bound = re.compile(r"ix_expenses_user_date_id \(user_id=\? AND date<")
+    else:
+        bound = re.compile(r"Index Cond: .*user_id = .*date <=")
+    assert any(bound.search(line) for line in plan), "\n".join(plan)
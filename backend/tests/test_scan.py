@@ -14,7 +14,7 @@ import pytest
 BOLETA_TEXT = """
 BOLETA ELECTRONICA N° 004521
 Emisor: Supermercado El Ahorro S.A.
-RUT: 76.123.456-7
+RUT: 76.123.456-0
 Razón Social: Supermercado El Ahorro S.A.
 Dirección: Av. Providencia 1234, Santiago
 
@@ -27,7 +27,7 @@ Total             $5.500
 
 FACTURA_TEXT = """
 FACTURA ELECTRONICA N° 001234
-RUT Emisor: 96543210-K
+RUT Emisor: 96543223-K
 Nombre: Distribuidora Santiago Ltda.
 Monto Total: 12.300
 """
@@ -41,23 +41,46 @@ NO_DATA_TEXT = "Este texto no tiene RUT ni monto ni razón social."
 
 class TestExtractRut:
     def test_found_with_dots(self):
-        assert _extract_rut(BOLETA_TEXT) == "76.123.456-7"
+        assert _extract_rut(BOLETA_TEXT) == "76.123.456-0"
 
     def test_found_without_dots(self):
-        text = "RUT del emisor: 76123456-7 en el documento"
+        text = "RUT del emisor: 76123456-0 en el documento"
         result = _extract_rut(text)
-        assert result == "76123456-7"
+        assert result == "76123456-0"
 
     def test_found_with_k_verifier(self):
         result = _extract_rut(FACTURA_TEXT)
-        assert result == "96543210-K"
+        assert result == "96543223-K"
 
     def test_not_found(self):
         assert _extract_rut(NO_DATA_TEXT) is None
 
     def test_returns_first_rut(self):
-        text = "Emisor: 12.345.678-9  Receptor: 98.765.432-1"
-        assert _extract_rut(text) == "12.345.678-9"
+        text = "Emisor: 12.345.678-5  Receptor: 98.765.432-5"
+        assert _extract_rut(text) == "12.345.678-5"
+
+    def test_skips_invalid_check_digit(self):
+        # Folio numbers and phone fragments look like RUTs but fail modulo 11
+        text = "Folio 12.345.678-9\nRUT: 98.765.432-5"
+        assert _extract_rut(text) == "98.765.432-5"
+        assert _extract_rut("RUT: 76.123.456-7") is None
+
+    def test_lowercase_k_verifier(self):
+        assert _extract_rut("RUT 96543223-k") == "96543223-k"
+
+    def test_label_dot_is_not_part_of_rut(self):
+        assert _extract_rut("R.U.T.76.123.456-0") == "76.123.456-0"
+        assert _extract_rut("R.U.T.: 76.123.456-0") == "76.123.456-0"
+
+    def test_ignores_rut_inside_longer_token(self):
+        assert _extract_rut("Ref A76.123.456-0 / 176.123.456-0") is None
+
+    def test_canonical_form(self):
+        from receipt_parser import canonical_rut
+
+        assert canonical_rut("76.123.456-0") == canonical_rut("076123456-0") == "761234560"
+        assert canonical_rut("96543223-k") == "96543223K"
+        assert canonical_rut("not a rut") is None
 
 
 class TestExtractAmount:
@@ -79,6 +102,11 @@ class TestExtractAmount:
         text = "Importe: 3.750"
         assert _extract_amount(text) == 3750.0
 
+    def test_total_after_name_on_same_line(self):
+        text = "Nombre: Kiosko Don Luis   Total: 2.300"
+        assert _extract_amount(text) == 2300.0
+        assert _extract_provider_name(text).startswith("Kiosko Don Luis")
+
 
 class TestExtractProviderName:
     def test_razon_social(self):
@@ -145,7 +173,372 @@ class TestScanEndpointValidation:
 
 
 # ──────────────────────────────────────────────────────────────────────────────
-# Part 3 — Integration test with a real receipt image + real Vision API
+# Part 3 — OCR result cache (Vision is stubbed out)
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestOcrCache:
+    def test_keys_include_mime_type(self):
+        from ocr_cache import OcrCache
+
+        assert OcrCache.key(b"same", "image/png") != OcrCache.key(b"same", "image/jpeg")
+        assert OcrCache.key(b"same", "image/png") == OcrCache.key(b"same", "image/png")
+
+    def test_memory_lru(self):
+        from ocr_cache import OcrCache
+
+        cache = OcrCache(max_entries=1)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        assert cache.get("a") is None and cache.get("b") == "B"
+        assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    def test_disk_tier_survives_restart_and_evicts(self, tmp_path):
+        from ocr_cache import OcrCache
+
+        cache = OcrCache(max_entries=0, disk_dir=str(tmp_path), disk_max_bytes=10)
+        cache.put("old", "123456")
+        os.utime(tmp_path / "old.txt", (0, 0))
+        cache.put("new", "abcdef")  # 12 bytes > 10: the older file goes
+        restarted = OcrCache(max_entries=4, disk_dir=str(tmp_path), disk_max_bytes=10)
+        assert restarted.get("old") is None
+        assert restarted.get("new") == "abcdef"
+
+    def test_disk_puts_keep_a_running_total(self, tmp_path, monkeypatch):
+        import asyncio
+        import ocr_cache
+        from ocr_cache import OcrCache
+
+        (tmp_path / "earlier.txt").write_text("x" * 40)
+        cache = OcrCache(max_entries=0, disk_dir=str(tmp_path), disk_max_bytes=100)
+        scans = []
+        real_scandir = os.scandir
+        monkeypatch.setattr(ocr_cache.os, "scandir", lambda path: scans.append(path) or real_scandir(path))
+
+        for i in range(5):
+            cache.put(f"k{i}", "y" * 10)
+            cache.put(f"k{i}", "z" * 10)  # overwrites are not counted twice
+        assert len(scans) == 1  # only the first put lists the directory
+        assert cache._disk_bytes == 90
+
+        asyncio.run(cache.aput("big", "w" * 20))  # 110 > 100: evict down to 90
+        assert len(scans) == 2
+        assert not (tmp_path / "earlier.txt").exists()
+        assert cache._disk_bytes == sum(p.stat().st_size for p in tmp_path.glob("*.txt")) <= 90
+        assert asyncio.run(cache.aget("big")) == "w" * 20
+
+    def test_reupload_skips_ocr(self, client, auth_headers, monkeypatch):
+        import routes.scan
+
+        calls = []
+
+        def fake_ocr(content, mime_type):
+            calls.append(content)
+            return BOLETA_TEXT
+
+        monkeypatch.setattr(routes.scan, "_ocr", fake_ocr)
+        upload = {"file": ("boleta.png", b"cache-me-bytes", "image/png")}
+        first = client.post("/scan/receipt", files=upload, headers=auth_headers)
+        second = client.post("/scan/receipt", files=upload, headers=auth_headers)
+        assert first.status_code == second.status_code == 200
+        assert first.json() == second.json()
+        assert second.json()["amount"] == 5500.0
+        assert len(calls) == 1
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Part 4 — OCR backends and the bounded executor
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestOcrBackends:
+    def test_fixture_backend_by_content_hash(self, tmp_path):
+        import hashlib
+        from ocr import FixtureBackend
+
+        (tmp_path / f"{hashlib.sha256(b'factura').hexdigest()}.txt").write_text(FACTURA_TEXT, encoding="utf-8")
+        backend = FixtureBackend(str(tmp_path))
+        assert backend.extract_text(b"factura", "application/pdf") == FACTURA_TEXT
+        assert backend.extract_text(b"other", "image/png") == FixtureBackend.DEFAULT_TEXT
+
+    def test_scan_with_fixture_backend(self, client, auth_headers, monkeypatch):
+        import ocr
+
+        monkeypatch.setattr(ocr, "OCR_BACKEND", "fixture")
+        ocr.get_backend.cache_clear()
+        try:
+            res = client.post(
+                "/scan/receipt",
+                files={"file": ("r.png", b"fixture-backend-bytes", "image/png")},
+                headers=auth_headers,
+            )
+        finally:
+            ocr.get_backend.cache_clear()
+        assert res.status_code == 200
+        assert res.json()["amount"] == 1000.0
+        assert res.json()["rut"] == "76.123.456-0"
+        assert res.json()["person"] is None
+
+    def test_scan_matches_saved_provider(self, client, auth_headers, monkeypatch):
+        import ocr
+
+        # Saved without dots; the receipt prints "76.123.456-0"
+        provider = client.post(
+            "/persons", json={"name": "Scan Match SpA", "type": "Company", "rut": "76123456-0"}, headers=auth_headers,
+        ).json()
+        monkeypatch.setattr(ocr, "OCR_BACKEND", "fixture")
+        ocr.get_backend.cache_clear()
+        try:
+            res = client.post(
+                "/scan/receipt",
+                files={"file": ("r.png", b"fixture-backend-bytes-2", "image/png")},
+                headers=auth_headers,
+            )
+        finally:
+            ocr.get_backend.cache_clear()
+            client.delete(f"/persons/{provider['id']}", headers=auth_headers)
+        assert res.status_code == 200
+        assert res.json()["person"]["id"] == provider["id"]
+
+
+class TestOcrPool:
+    def test_saturated_pool_returns_503(self, client, auth_headers, monkeypatch):
+        import threading
+        import routes.scan
+        from ocr import OcrPool
+
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocking_ocr(content, mime_type):
+            started.set()
+            release.wait(5)
+            return ""
+
+        pool = OcrPool(workers=1, queue_depth=0, timeout=5)
+        monkeypatch.setattr(routes.scan, "ocr_pool", pool)
+        monkeypatch.setattr(routes.scan, "_ocr", blocking_ocr)
+
+        results = {}
+        worker = threading.Thread(target=lambda: results.setdefault("first", client.post(
+            "/scan/receipt", files={"file": ("a.png", b"slow-1", "image/png")}, headers=auth_headers,
+        )))
+        worker.start()
+        assert started.wait(5)
+        busy = client.post("/scan/receipt", files={"file": ("b.png", b"slow-2", "image/png")}, headers=auth_headers)
+        release.set()
+        worker.join(5)
+
+        assert busy.status_code == 503
+        assert results["first"].status_code == 200
+
+    def test_timeout_returns_504(self, client, auth_headers, monkeypatch):
+        import time
+        import routes.scan
+        from ocr import OcrPool
+
+        monkeypatch.setattr(routes.scan, "ocr_pool", OcrPool(workers=1, queue_depth=0, timeout=0.05))
+        monkeypatch.setattr(routes.scan, "_ocr", lambda content, mime_type: time.sleep(0.3) or "")
+        res = client.post("/scan/receipt", files={"file": ("t.png", b"timeout", "image/png")}, headers=auth_headers)
+        assert res.status_code == 504
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Part 5 — Batch scanning (/scan/receipts)
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _ndjson(res):
+    import json
+    return [json.loads(line) for line in res.text.splitlines()]
+
+
+class TestScanBatch:
+    def test_streams_one_result_per_file(self, client, auth_headers, monkeypatch):
+        import routes.scan
+        from ocr import OcrBackend
+
+        texts = {b"batch-boleta": BOLETA_TEXT, b"batch-factura": FACTURA_TEXT}
+
+        class MappingBackend(OcrBackend):
+            name = "mapping"
+
+            def extract_text(self, content, mime_type):
+                return texts[content]
+
+        monkeypatch.setattr(routes.scan, "get_backend", MappingBackend)
+        res = client.post(
+            "/scan/receipts",
+            files=[
+                ("files", ("b.jpg", b"batch-boleta", "image/jpeg")),
+                ("files", ("notes.txt", b"hello", "text/plain")),
+                ("files", ("f.pdf", b"batch-factura", "application/pdf")),
+            ],
+            headers=auth_headers,
+        )
+        assert res.status_code == 200
+        assert res.headers["content-type"].startswith("application/x-ndjson")
+        results = {r["index"]: r for r in _ndjson(res)}
+        assert sorted(results) == [0, 1, 2]
+        assert results[0]["status"] == 200 and results[0]["amount"] == 5500.0
+        assert results[1]["status"] == 415
+        assert results[2]["rut"] == "96543223-K" and results[2]["filename"] == "f.pdf"
+
+    def test_native_batch_backend(self, client, auth_headers, monkeypatch):
+        import routes.scan
+        from ocr import OcrBackend
+
+        class RecordingBackend(OcrBackend):
+            name = "recording"
+            batch_size = 2
+
+            def __init__(self):
+                self.batches = []
+
+            def extract_batch(self, items):
+                self.batches.append(len(items))
+                return [BOLETA_TEXT if content != b"bad" else RuntimeError("unreadable") for content, _ in items]
+
+        backend = RecordingBackend()
+        monkeypatch.setattr(routes.scan, "get_backend", lambda: backend)
+        res = client.post(
+            "/scan/receipts",
+            files=[("files", (f"{i}.png", b"bad" if i == 1 else f"native-{i}".encode(), "image/png")) for i in range(3)],
+            headers=auth_headers,
+        )
+        results = {r["index"]: r for r in _ndjson(res)}
+        assert sorted(backend.batches) == [1, 2]
+        assert results[1]["status"] == 502 and "unreadable" in results[1]["detail"]
+        assert results[0]["amount"] == results[2]["amount"] == 5500.0
+
+    def test_results_match_single_file_shape(self, client, auth_headers, monkeypatch):
+        import routes.scan
+        from ocr import OcrBackend
+
+        class FacturaBackend(OcrBackend):
+            name = "factura"
+
+            def extract_text(self, content, mime_type):
+                return FACTURA_TEXT
+
+        monkeypatch.setattr(routes.scan, "get_backend", FacturaBackend)
+        provider = client.post(
+            "/persons", json={"name": "Batch Match Ltda", "type": "Company", "rut": "96543223-k"},
+            headers=auth_headers,
+        ).json()
+        try:
+            single = client.post(
+                "/scan/receipt", files={"file": ("s.png", b"shape-single", "image/png")}, headers=auth_headers,
+            ).json()
+            # One line served from the cache, one scanned
+            res = client.post(
+                "/scan/receipts",
+                files=[
+                    ("files", ("s.png", b"shape-single", "image/png")),
+                    ("files", ("t.png", b"shape-batch", "image/png")),
+                ],
+                headers=auth_headers,
+            )
+        finally:
+            client.delete(f"/persons/{provider['id']}", headers=auth_headers)
+        lines = _ndjson(res)
+        assert len(lines) == 2
+        for line in lines:
+            assert set(line) - {"index", "filename", "status"} == set(single)
+            assert line["person"]["id"] == single["person"]["id"] == provider["id"]
+
+    def test_too_many_files(self, client, auth_headers, monkeypatch):
+        import routes.scan
+
+        monkeypatch.setattr(routes.scan, "MAX_BATCH_FILES", 1)
+        res = client.post(
+            "/scan/receipts",
+            files=[("files", ("a.png", b"a", "image/png")), ("files", ("b.png", b"b", "image/png"))],
+            headers=auth_headers,
+        )
+        assert res.status_code == 400
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Part 6 — Multi-page PDFs
+# ──────────────────────────────────────────────────────────────────────────────
+
+class PagedBackend:
+    """Fake backend serving a PDF of ``total`` pages, two pages per call."""
+
+    name = "paged"
+    batch_size = 1
+    pdf_pages_per_call = 2
+
+    def __init__(self, total):
+        import threading
+
+        self.total = total
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def extract_pdf_pages(self, content, pages):
+        import time
+
+        pages = pages or [1, 2]
+        with self._lock:
+            self.calls.append(pages)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05)
+        with self._lock:
+            self.in_flight -= 1
+        texts = [f"Pagina {p}\nSubtotal: {p}.000" for p in pages if p <= self.total]
+        if self.total in pages:
+            texts[-1] += "\nTotal: 99.000"
+        return texts, self.total
+
+
+class TestMultiPagePdf:
+    def test_all_pages_merged_and_last_total_wins(self, client, auth_headers, monkeypatch):
+        import routes.scan
+        from ocr import PAGE_BREAK
+
+        backend = PagedBackend(total=7)
+        monkeypatch.setattr(routes.scan, "get_backend", lambda: backend)
+        res = client.post(
+            "/scan/receipt",
+            files={"file": ("factura.pdf", b"%PDF-seven-pages", "application/pdf")},
+            headers=auth_headers,
+        )
+        assert res.status_code == 200, res.text
+        data = res.json()
+        assert data["raw_text"].count(PAGE_BREAK) == 6
+        assert data["raw_text"].index("Pagina 3") < data["raw_text"].index("Pagina 7")
+        assert data["amount"] == 99000.0
+        assert backend.calls[0] == [1, 2]
+        assert sorted(map(tuple, backend.calls[1:])) == [(3, 4), (5, 6), (7,)]
+        assert backend.max_in_flight > 1
+
+    def test_page_limit(self, client, auth_headers, monkeypatch):
+        import routes.scan
+        from ocr import PAGE_BREAK
+
+        backend = PagedBackend(total=50)
+        monkeypatch.setattr(routes.scan, "get_backend", lambda: backend)
+        monkeypatch.setattr(routes.scan, "OCR_PDF_MAX_PAGES", 5)
+        res = client.post(
+            "/scan/receipt",
+            files={"file": ("long.pdf", b"%PDF-fifty-pages", "application/pdf")},
+            headers=auth_headers,
+        )
+        assert res.json()["raw_text"].count(PAGE_BREAK) == 4
+        assert max(p for call in backend.calls for p in call) == 5
+
+    def test_amount_prefers_last_page(self):
+        from ocr import PAGE_BREAK
+
+        text = PAGE_BREAK.join(["Total: 1.000", "detalle sin monto", "Monto Total: 25.500"])
+        assert _extract_amount(text) == 25500.0
+        assert _extract_amount(PAGE_BREAK.join(["Total: 1.000", "sin monto"])) == 1000.0
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Part 7 — Integration test with a real receipt image + real Vision API
 #
 # To run: place your receipt photo at  backend/tests/fixtures/boleta.jpg
 #         then: gcloud auth application-default login
@@ -0,0 +1,98 @@
+import gzip
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import spa
+
+SHELL = b"<!doctype html><html><body><div id=root></div>" + b"<script></script>" * 50 + b"</body></html>"
+BUNDLE = b"console.log('expenses');\n" * 200
+
+
+@pytest.fixture
+def spa_client(tmp_path):
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "index.html").write_bytes(SHELL)
+    (tmp_path / "assets" / "index-1a2b3c.js").write_bytes(BUNDLE)
+    (tmp_path / "favicon.png").write_bytes(b"\x89PNG" + bytes(range(256)))
+    app = FastAPI()
+    spa.mount(app, str(tmp_path))
+    with TestClient(app) as client:
+        yield client
+
+
+def test_index_is_revalidated_with_etag(spa_client):
+    res = spa_client.get("/", headers={"Accept-Encoding": "identity"})
+    assert res.status_code == 200 and res.content == SHELL
+    assert res.headers["cache-control"] == "no-cache"
+    etag = res.headers["etag"]
+
+    again = spa_client.get("/", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == etag
+
+
+def test_client_routes_fall_back_to_index(spa_client):
+    res = spa_client.get("/expenses/42", headers={"Accept-Encoding": "identity"})
+    assert res.status_code == 200 and res.content == SHELL
+    assert res.headers["content-type"].startswith("text/html")
+
+
+def test_assets_are_immutable_and_compressed(spa_client):
+    res = spa_client.get("/assets/index-1a2b3c.js", headers={"Accept-Encoding": "gzip"})
+    assert res.status_code == 200
+    assert res.headers["cache-control"] == spa.ASSET_CACHE
+    assert res.headers["content-encoding"] == "gzip"
+    assert res.headers["vary"] == "Accept-Encoding"
+    assert int(res.headers["content-length"]) < len(BUNDLE)
+    assert res.content == BUNDLE  # decoded by the client
+
+    assert spa_client.get("/assets/missing-000.js").status_code == 404
+
+
+def test_encoding_negotiation():
+    assert spa.accepted_codings("gzip, deflate, br") == {"gzip", "deflate", "br"}
+    assert spa.accepted_codings("br;q=0, gzip;q=0.5") == {"gzip"}
+    assert spa.accepted_codings("") == set()
+
+
+def test_binary_files_are_not_precompressed(tmp_path):
+    (tmp_path / "index.html").write_bytes(SHELL)
+    (tmp_path / "favicon.png").write_bytes(b"\x89PNG" + bytes(range(256)))
+    index = spa.build_index(str(tmp_path))
+    assert set(index["favicon.png"].bodies) == {"identity"}
+    assert gzip.decompress(index["index.html"].bodies["gzip"]) == SHELL
+    if spa.brotli is not None:
+        assert spa.brotli.decompress(index["index.html"].bodies["br"]) == SHELL
+
+
+def test_head_matches_get_without_body(spa_client):
+    for path in ("/assets/index-1a2b3c.js", "/expenses/42"):
+        get = spa_client.get(path, headers={"Accept-Encoding": "gzip"})
+        head = spa_client.head(path, headers={"Accept-Encoding": "gzip"})
+        assert head.status_code == 200 and head.content == b""
+        for header in ("content-length", "content-encoding", "etag", "cache-control", "content-type"):
+            assert head.headers[header] == get.headers[header]
+    assert spa_client.head("/assets/missing-000.js").status_code == 404
+
+
+def test_build_time_variants_are_served(tmp_path, monkeypatch):
+    (tmp_path / "assets").mkdir()
+    bundle = tmp_path / "assets" / "index-1a2b3c.js"
+    bundle.write_bytes(BUNDLE)
+    assert spa.precompress(str(tmp_path)) == (2 if spa.brotli is not None else 1)
+    assert gzip.decompress((tmp_path / "assets" / "index-1a2b3c.js.gz").read_bytes()) == BUNDLE
+
+    def no_compression(*args, **kwargs):
+        raise AssertionError("compressed at boot")
+
+    monkeypatch.setattr(spa, "_compress", no_compression)
+    index = spa.build_index(str(tmp_path))
+    # The variants are read, not indexed as files of their own
+    assert list(index) == ["assets/index-1a2b3c.js"]
+    assert index["assets/index-1a2b3c.js"].bodies["gzip"] == (tmp_path / "assets" / "index-1a2b3c.js.gz").read_bytes()
@@ -0,0 +1,90 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from sqlalchemy import func, select
+
+from models import Category, Expense, Person, User
+from tests.conftest import TestSessionLocal
+
+
+@pytest.fixture
+def usage(client, auth_headers):
+    # Give testuser a known footprint on top of whatever other tests left
+    provider = client.post(
+        "/persons", json={"name": "Directory Shop", "type": "Company", "rut": "76.000.001-3"}, headers=auth_headers,
+    ).json()
+    for amount in (1000.0, 2500.0):
+        client.post("/expenses", json={
+            "title": "Directory", "amount": amount, "category": "Directory", "date": "2021-03-01",
+            "provider_id": provider["id"], "recipient_id": provider["id"],
+        }, headers=auth_headers)
+
+    with TestSessionLocal() as db:
+        user_id = db.scalar(select(User.id).where(User.username == "testuser"))
+        return {
+            "id": user_id,
+            "expense_count": db.scalar(select(func.count()).where(Expense.user_id == user_id)),
+            "expense_total": db.scalar(select(func.sum(Expense.amount)).where(Expense.user_id == user_id)),
+            "person_count": db.scalar(select(func.count()).where(Person.user_id == user_id)),
+            "category_count": db.scalar(select(func.count()).where(Category.user_id == user_id)),
+        }
+
+
+class TestUserDirectory:
+    def test_admin_only(self, client, auth_headers):
+        assert client.get("/users/directory", headers=auth_headers).status_code == 403
+
+    def test_aggregates(self, client, admin_headers, usage):
+        rows = client.get("/users/directory", params={"limit": 200}, headers=admin_headers).json()
+        row = next(r for r in rows if r["id"] == usage["id"])
+        for key in ("expense_count", "person_count", "category_count"):
+            assert row[key] == usage[key]
+        assert row["expense_total"] == pytest.approx(usage["expense_total"])
+        assert row["last_activity"] is not None
+        admin = next(r for r in rows if r["username"] == "testadmin")
+        assert admin["expense_count"] == 0 and admin["expense_total"] == 0.0
+
+    @pytest.mark.parametrize("sort", ["expense_total", "expense_count", "person_count", "username"])
+    def test_sorted_and_paginated(self, client, admin_headers, usage, sort):
+        seen, cursor = [], None
+        while True:
+            params = {"sort": sort, "order": "desc", "limit": 1, **({"cursor": cursor} if cursor else {})}
+            res = client.get("/users/directory", params=params, headers=admin_headers)
+            assert res.status_code == 200 and len(res.json()) == 1
+            seen.extend(res.json())
+            cursor = res.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+        keys = [row[sort] for row in seen]
+        assert keys == sorted(keys, reverse=True)
+        assert len({row["id"] for row in seen}) == len(seen)
+
+    def test_invalid_parameters(self, client, admin_headers):
+        assert client.get("/users/directory", params={"sort": "password"}, headers=admin_headers).status_code == 422
+        assert client.get("/users/directory", params={"cursor": "???"}, headers=admin_headers).status_code == 400
+
+    def test_single_statement(self, client, admin_headers, usage, query_budget):
+        res = client.get("/users/directory", headers=admin_headers)
+        # principal lookup (if not cached) + the one grouped query
+        query_budget(res, 2)
+
+    def test_deletions_count_as_activity(self, client, admin_headers):
+        client.post("/auth/register", json={"username": "dirdeleter", "email": "dd@test.com", "password": "pw"})
+        token = client.post("/auth/login", data={"username": "dirdeleter", "password": "pw"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        shop = client.post(
+            "/persons", json={"name": "Gone Shop", "type": "Company", "rut": "1-9"}, headers=headers,
+        ).json()
+        expense = client.post("/expenses", json={
+            "title": "Gone", "amount": 1.0, "category": "Gone", "date": "2021-03-01",
+            "provider_id": shop["id"], "recipient_id": shop["id"],
+        }, headers=headers).json()
+        client.delete(f"/expenses/{expense['id']}", headers=headers)
+
+        rows = client.get("/users/directory", params={"limit": 200}, headers=admin_headers).json()
+        row = next(r for r in rows if r["username"] == "dirdeleter")
+        assert row["expense_count"] == 0
+        assert row["last_activity"] is not None and row["last_activity"] >= expense["updated_at"]
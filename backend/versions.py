@@ -0,0 +1,163 @@
+"""Per-user collection version counters and conditional GET for the lists.
+
+Every ORM write to an Expense, Category or Person bumps its owner's counter
+for that collection from a before_flush hook, in the same transaction (the
+async session runs on the same class). Core-level bulk writes bypass the ORM
+and must call bump themselves.
+
+The "expenses" counter doubles as the change sequence for delta sync: the
+hook stamps each written expense with the new value (change_seq) and leaves
+an ExpenseTombstone carrying it for each deleted one. An edited person is
+embedded in its expenses, so those are stamped too (one UPDATE per
+owner). The counter row is locked by the bump until commit, so one user's
+sequence numbers become visible in order.
+
+GET /expenses, /categories and /persons use the counters as a weak ETag, so
+a matching If-None-Match gets a 304 after a single primary-key lookup,
+without running the list query or serializing anything.
+"""
+import datetime
+from itertools import chain
+
+from fastapi import Request, Response
+from sqlalchemy import and_, event, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from database import UPSERT_INSERTS
+from models import Category, CollectionVersion, Expense, ExpenseTombstone, Person, User
+
+COLLECTIONS = {Expense: "expenses", Category: "categories", Person: "persons"}
+
+# Browsers revalidate on every request and must not share the cached body
+# between the users of one machine.
+CACHE_HEADERS = {"Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+
+def bump(connection, keys) -> dict:
+    """Increment the (user_id, collection) counters in ``keys``; return the new values."""
+    values = [{"user_id": u, "collection": c, "version": 1} for u, c in sorted(keys)]
+    if not values:
+        return {}
+    dialect_insert = UPSERT_INSERTS.get(connection.dialect.name)
+    if dialect_insert is None:
+        for row in values:
+            result = connection.execute(
+                update(CollectionVersion)
+                .where(CollectionVersion.user_id == row["user_id"], CollectionVersion.collection == row["collection"])
+                .values(version=CollectionVersion.version + 1)
+            )
+            if result.rowcount == 0:
+                connection.execute(insert(CollectionVersion).values(row))
+        return _read(connection, keys)
+    stmt = dialect_insert(CollectionVersion).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CollectionVersion.user_id, CollectionVersion.collection],
+        set_={"version": CollectionVersion.version + 1},
+    )
+    if not connection.dialect.insert_returning:
+        connection.execute(stmt)
+        return _read(connection, keys)
+    rows = connection.execute(
+        stmt.returning(CollectionVersion.user_id, CollectionVersion.collection, CollectionVersion.version)
+    )
+    return {(u, c): v for u, c, v in rows}
+
+
+def _read(connection, keys) -> dict:
+    rows = connection.execute(
+        select(CollectionVersion.user_id, CollectionVersion.collection, CollectionVersion.version)
+        .where(or_(*(
+            and_(CollectionVersion.user_id == u, CollectionVersion.collection == c) for u, c in keys
+        )))
+    )
+    return {(u, c): v for u, c, v in rows}
+
+
+@event.listens_for(Session, "before_flush")
+def _track_collection_writes(session, flush_context, instances):
+    touched = set()
+    expenses = []
+    edited_persons = {}  # owner id -> ids of their persons edited in this flush
+    for obj in chain(session.new, session.dirty, session.deleted):
+        collection = COLLECTIONS.get(type(obj))
+        if collection is None or (obj in session.dirty and not session.is_modified(obj)):
+            continue
+        touched.add((obj.user_id, collection))
+        if collection == "expenses":
+            expenses.append(obj)
+        elif collection == "persons" and obj in session.dirty:
+            edited_persons.setdefault(obj.user_id, set()).add(obj.id)
+            touched.add((obj.user_id, "expenses"))
+    if not touched:
+        return
+    new_versions = bump(session.connection(), touched)
+
+    now = datetime.datetime.utcnow()
+    deleted_users = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    tombstones = []
+    for expense in expenses:
+        seq = new_versions[(expense.user_id, "expenses")]
+        if expense not in session.deleted:
+            expense.change_seq = seq
+            expense.updated_at = now
+        elif expense.user_id not in deleted_users:
+            tombstones.append({
+                "expense_id": expense.id, "user_id": expense.user_id, "change_seq": seq, "deleted_at": now,
+            })
+    if tombstones:
+        session.connection().execute(insert(ExpenseTombstone), tombstones)
+    for user_id, person_ids in edited_persons.items():
+        # Persons only appear on their owner's expenses
+        session.connection().execute(
+            update(Expense)
+            .where(
+                Expense.user_id == user_id,
+                or_(Expense.provider_id.in_(person_ids), Expense.recipient_id.in_(person_ids)),
+            )
+            .values(change_seq=new_versions[(user_id, "expenses")], updated_at=now)
+        )
+
+
+def version_statement(current_user: User, collections: tuple, all_users: bool = False):
+    # Counters only grow and rows are never deleted, so the sum over every
+    # user is itself a version for admin views spanning all of them.
+    stmt = (
+        select(CollectionVersion.collection, func.sum(CollectionVersion.version))
+        .where(CollectionVersion.collection.in_(collections))
+        .group_by(CollectionVersion.collection)
+    )
+    return stmt if all_users else stmt.where(CollectionVersion.user_id == current_user.id)
+
+
+def make_etag(current_user: User, collections: tuple, rows, all_users: bool = False) -> str:
+    versions = dict(rows)
+    scope = "all" if all_users else f"u{current_user.id}"
+    return f'W/"{scope}-' + "-".join(str(versions.get(c, 0)) for c in collections) + '"'
+
+
+def current_etag(db: Session, current_user: User, collections: tuple, all_users: bool = False) -> str:
+    rows = db.execute(version_statement(current_user, collections, all_users)).all()
+    return make_etag(current_user, collections, rows, all_users)
+
+
+async def current_etag_async(db, current_user: User, collections: tuple, all_users: bool = False) -> str:
+    rows = (await db.execute(version_statement(current_user, collections, all_users))).all()
+    return make_etag(current_user, collections, rows, all_users)
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Response | None:
+    """Return a 304 if the client already holds ``etag``; otherwise tag ``response``."""
+    headers = {"ETag": etag, **CACHE_HEADERS}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Weak comparison (RFC 9110 §13.1.2): ignore the W/ prefix
+        candidates = {_opaque(tag) for tag in if_none_match.split(",")}
+        if "*" in candidates or _opaque(etag) in candidates:
+            return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
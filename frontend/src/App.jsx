@@ -17,6 +17,9 @@ export default function App() {
   const [view, setView] = useState('app')           // 'app' | 'admin' | 'categories' | 'persons' | 'profile'
   const [authView, setAuthView] = useState('login') // 'login' | 'register'
   const [expenses, setExpenses] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+  // Bumped when the expense set changes (load, create, update, delete), not on "Load more"
+  const [expensesVersion, setExpensesVersion] = useState(0)
   const [categories, setCategories] = useState([])
   const [persons, setPersons] = useState([])
   const [editing, setEditing] = useState(null)
@@ -31,7 +34,21 @@ export default function App() {
 
   async function fetchExpenses() {
     const res = await authFetch('/expenses')
-    if (res.ok) setExpenses(await res.json())
+    if (res.ok) {
+      setExpenses(await res.json())
+      setNextCursor(res.headers.get('X-Next-Cursor'))
+      setExpensesVersion((v) => v + 1)
+    }
+  }
+
+  async function loadMoreExpenses() {
+    if (!nextCursor) return
+    const res = await authFetch(`/expenses?cursor=${encodeURIComponent(nextCursor)}`)
+    if (res.ok) {
+      const page = await res.json()
+      setExpenses((prev) => [...prev, ...page])
+      setNextCursor(res.headers.get('X-Next-Cursor'))
+    }
   }
 
   async function fetchCategories() {
@@ -95,7 +112,7 @@ export default function App() {
         />
       ) : (
         <main className="app-main">
-          <ExpenseDashboard expenses={expenses} categories={categories} />
+          <ExpenseDashboard authFetch={authFetch} refreshKey={expensesVersion} categories={categories} />
           <div className="app-content">
             <div className="left-panel">
               <ExpenseForm
@@ -114,6 +131,8 @@ export default function App() {
                 onEdit={setEditing}
                 onDelete={handleDelete}
                 categories={categories}
+                hasMore={Boolean(nextCursor)}
+                onLoadMore={loadMoreExpenses}
               />
             </div>
           </div>
@@ -1,39 +1,44 @@
+import { useState, useEffect } from 'react'
 import './ExpenseDashboard.css'
 
+const EMPTY_SUMMARY = {
+  total: 0, count: 0, largest: 0,
+  by_month: [], by_category: [], by_provider: [], by_recipient: [],
+}
+
 function getMonthLabel(date) {
   return date.toLocaleString('default', { month: 'long', year: 'numeric' })
 }
 
-export default function ExpenseDashboard({ expenses, categories = [] }) {
+export default function ExpenseDashboard({ authFetch, refreshKey, categories = [] }) {
+  const [summary, setSummary] = useState(EMPTY_SUMMARY)
+
+  // Totals are grouped server-side; refetch when expenses are written, not
+  // when another page of the list is loaded
+  useEffect(() => {
+    authFetch('/expenses/summary')
+      .then((r) => (r.ok ? r.json() : EMPTY_SUMMARY))
+      .then(setSummary)
+  }, [refreshKey])
+
   const now = new Date()
   const currentYM = `${now.getFullYear()}-${String(now.getMonth() + 1).padStart(2, '0')}`
 
-  const thisMonth = expenses.filter((e) => e.date.slice(0, 7) === currentYM)
-  const thisMonthTotal = thisMonth.reduce((s, e) => s + e.amount, 0)
-  const allTotal = expenses.reduce((s, e) => s + e.amount, 0)
-  const avg = expenses.length ? allTotal / expenses.length : 0
-  const largest = expenses.length ? Math.max(...expenses.map((e) => e.amount)) : 0
+  const thisMonth = summary.by_month.find((m) => m.key === currentYM) || { total: 0, count: 0 }
+  const thisMonthTotal = thisMonth.total
+  const allTotal = summary.total
+  const avg = summary.count ? allTotal / summary.count : 0
+  const largest = summary.largest
 
   // Category breakdown (all time)
   const colorMap = Object.fromEntries(categories.map((c) => [c.name, c.color]))
-  const catTotals = {}
-  for (const e of expenses) {
-    catTotals[e.category] = (catTotals[e.category] || 0) + e.amount
-  }
-  const catRows = Object.entries(catTotals)
-    .map(([name, total]) => ({ name, total, color: colorMap[name] || '#888' }))
-    .sort((a, b) => b.total - a.total)
+  const catRows = summary.by_category
+    .map((c) => ({ name: c.key, total: c.total, color: colorMap[c.key] || '#888' }))
   const catMax = catRows[0]?.total || 1
 
   // Recipient breakdown (all time)
-  const recTotals = {}
-  for (const e of expenses) {
-    const name = e.recipient?.name || 'Unknown'
-    recTotals[name] = (recTotals[name] || 0) + e.amount
-  }
-  const recRows = Object.entries(recTotals)
-    .map(([name, total]) => ({ name, total }))
-    .sort((a, b) => b.total - a.total)
+  const recRows = summary.by_recipient
+    .map((r) => ({ name: r.name, total: r.total }))
     .slice(0, 6)
   const recMax = recRows[0]?.total || 1
 
@@ -44,12 +49,12 @@ export default function ExpenseDashboard({ expenses, categories = [] }) {
         <div className="dash-kpi dark">
           <span className="kpi-label">{getMonthLabel(now)}</span>
           <span className="kpi-value">${thisMonthTotal.toFixed(2)}</span>
-          <span className="kpi-sub">{thisMonth.length} expense{thisMonth.length !== 1 ? 's' : ''}</span>
+          <span className="kpi-sub">{thisMonth.count} expense{thisMonth.count !== 1 ? 's' : ''}</span>
         </div>
         <div className="dash-kpi">
           <span className="kpi-label">All Time</span>
           <span className="kpi-value">${allTotal.toFixed(2)}</span>
-          <span className="kpi-sub">{expenses.length} total</span>
+          <span className="kpi-sub">{summary.count} total</span>
         </div>
         <div className="dash-kpi">
           <span className="kpi-label">Average</span>
@@ -63,7 +68,7 @@ export default function ExpenseDashboard({ expenses, categories = [] }) {
         </div>
       </div>
 
-      {expenses.length > 0 && (
+      {summary.count > 0 && (
         <div className="dash-charts">
           {/* By category */}
           {catRows.length > 0 && (
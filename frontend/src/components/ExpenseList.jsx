@@ -1,6 +1,6 @@
 import './ExpenseList.css'
 
-export default function ExpenseList({ expenses, onEdit, onDelete, categories = [] }) {
+export default function ExpenseList({ expenses, onEdit, onDelete, categories = [], hasMore = false, onLoadMore }) {
   const colorMap = Object.fromEntries(categories.map((c) => [c.name, c.color]))
   if (expenses.length === 0) {
     return (
@@ -35,6 +35,9 @@ export default function ExpenseList({ expenses, onEdit, onDelete, categories = [
           </li>
         ))}
       </ul>
+      {hasMore && (
+        <button className="load-more" onClick={onLoadMore}>Load more</button>
+      )}
     </div>
   )
 }
@@ -1,16 +1,10 @@
 import './ExpenseSummary.css'
 
-const CATEGORIES = ['Food', 'Transport', 'Housing', 'Health', 'Entertainment', 'Other']
-
-export default function ExpenseSummary({ expenses }) {
-  const total = expenses.reduce((sum, e) => sum + e.amount, 0)
-
-  const byCategory = CATEGORIES.map((cat) => ({
-    category: cat,
-    total: expenses
-      .filter((e) => e.category === cat)
-      .reduce((sum, e) => sum + e.amount, 0),
-  })).filter((c) => c.total > 0)
+export default function ExpenseSummary({ summary }) {
+  const total = summary.total
+  const byCategory = summary.by_category
+    .map((c) => ({ category: c.key, total: c.total }))
+    .filter((c) => c.total > 0)
 
   return (
     <div className="summary">